@@ -0,0 +1,58 @@
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from statistics import median
+
+# the scripts run from a checkout (`python benchmarks/suite.py`) without installing ezweb
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ezweb import EzSource
+from ezweb.utils import metrics
+from ezweb.utils.http import soup_of
+
+CORPUS = Path(__file__).parent / "corpus"
+
+
+def load(name: str) -> str:
+    return (CORPUS / name).read_text(encoding="utf-8")
+
+
+def timed(func, rounds: int = 20) -> float:
+    """Returns the median run time of `func()` in milliseconds"""
+    results = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        results.append(time.perf_counter() - start)
+    return round(median(results) * 1000, 2)
+
+
+def offline_source(url: str) -> EzSource:
+    """An `EzSource` that its homepage is read from the corpus instead of the network"""
+    source = EzSource(url)
+    source.soup = soup_of(load("home.html"))
+    return source
+
+
+@contextmanager
+def count_parses():
+    """
+    Counts the parses (the `ParseEvent`s of the metrics , of all the threads)
+    while the block runs , yields the `Counter`
+    """
+    counts = Counter()
+    lock = threading.Lock()
+
+    def hook(event):
+        if isinstance(event, metrics.ParseEvent):
+            with lock:
+                counts[event.kind] += 1
+
+    metrics.add_hook(hook)
+    try:
+        yield counts
+    finally:
+        metrics.remove_hook(hook)
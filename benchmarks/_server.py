@@ -0,0 +1,101 @@
+"""
+A local stand-in of the web for the benchmarks , every `http(s)://` request of the ezweb
+session is answered from the corpus by a transport adapter (no socket , no network)
+so the numbers are reproducible offline.
+"""
+import io
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+
+from _common import CORPUS  # first , it puts the checkout on `sys.path`
+from ezweb import EzSource
+from ezweb.utils.session import EzSession, get_session, set_session
+
+# path prefix -> (corpus file , content type) , the first match wins
+ROUTES = [
+    ("/robots.txt", "robots.txt", "text/plain"),
+    ("/rss", "feed.xml", "application/rss+xml"),
+    ("/sitemap.xml", "sitemap.xml", "application/xml"),
+    ("/sitemap-news.xml", "sitemap-news.xml", "application/xml"),
+    ("/sitemap-products.xml", "sitemap-products.xml", "application/xml"),
+    ("/news/", "article.html", "text/html; charset=utf-8"),
+    ("/product/", "product.html", "text/html; charset=utf-8"),
+    ("/category/", "home.html", "text/html; charset=utf-8"),
+    ("/section/", "home.html", "text/html; charset=utf-8"),
+]
+HOME = ("home.html", "text/html; charset=utf-8")
+
+
+class CorpusAdapter(HTTPAdapter):
+    """Answers the requests from the corpus files , counts the requests and the bytes served"""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        super().__init__()
+        self.latency = latency
+        self.requests = Counter()
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+        self._files = {}
+
+    def _file(self, name: str) -> bytes:
+        if name not in self._files:
+            self._files[name] = (CORPUS / name).read_bytes()
+        return self._files[name]
+
+    def _route(self, path: str):
+        if path in ("", "/"):
+            return HOME
+        for prefix, name, content_type in ROUTES:
+            if path == prefix or path.startswith(prefix) and prefix.endswith("/"):
+                return name, content_type
+        return None
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        path = urlparse(request.url).path
+        route = self._route(path)
+        if route is None:
+            status, body, content_type = 404, b"not found", "text/plain"
+        else:
+            status, body, content_type = 200, self._file(route[0]), route[1]
+        if request.method == "HEAD":
+            payload = b""
+        else:
+            payload = body
+        with self._lock:
+            self.requests[route[0] if route else "404"] += 1
+            self.bytes_served += len(payload)
+        if self.latency:
+            time.sleep(self.latency)
+        raw = HTTPResponse(
+            body=io.BytesIO(payload),
+            headers={"Content-Type": content_type, "Content-Length": str(len(body))},
+            status=status,
+            preload_content=False,
+            decode_content=False,
+            request_method=request.method,
+        )
+        return self.build_response(request, raw)
+
+
+@contextmanager
+def serve_corpus(latency: float = 0.0):
+    """
+    Routes the ezweb session to a `CorpusAdapter` (yielded) while the block runs ,
+    `latency` seconds are added to each request to model the network
+    """
+    previous = get_session()
+    session = EzSession()
+    adapter = CorpusAdapter(latency)
+    session._adapters = {"http://": adapter, "https://": adapter}
+    set_session(session)
+    EzSource.registry.clear()
+    try:
+        yield adapter
+    finally:
+        set_session(previous)
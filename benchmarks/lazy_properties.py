@@ -0,0 +1,48 @@
+"""
+Per-property timing of a fresh `EzSoup` and which parsers each property triggers
+(the `ParseEvent`s of the metrics).
+A text-only pipeline (`main_text` , `title`) shouldn't build the whole BeautifulSoup tree ,
+`title` builds just the soup of the `<head>` for the site name.
+
+Runs offline on `corpus/article.html` :
+
+    python benchmarks/lazy_properties.py
+"""
+from collections import Counter
+
+from _common import count_parses, load, offline_source, timed  # first , it puts the checkout on `sys.path`
+from ezweb import EzSoup
+
+URL = "https://news.example.com/news/2021/10/city-council-approves-new-housing-plan"
+ROUNDS = 5
+PROPERTIES = [
+    "main_text",
+    "title",
+    "last_date",
+    "title_tag_text",
+    "meta_description",
+    "main_image_src",
+    "topic_names",
+    "important_hrefs",
+]
+def main():
+    html = load("article.html")
+    source = offline_source(URL)
+    print(f"{'property':<20}{'ms':>10}   parses")
+    for name in PROPERTIES:
+        parses = Counter()
+
+        def run():
+            with count_parses() as counts:
+                getattr(EzSoup(content=html, url=URL, source=source), name)
+            # the parses of the last round
+            parses.clear()
+            parses.update(counts)
+
+        ms = timed(run, ROUNDS)
+        parses = [f"{kind} x{n}" if n > 1 else kind for kind, n in parses.items()]
+        print(f"{name:<20}{ms:>10}   {', '.join(parses)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Memory per retained page , keeping the `EzSoup` objects of a crawl
+vs keeping just their `freeze(fields)` records.
+
+Runs offline on `corpus/article.html` :
+
+    python benchmarks/memory.py
+"""
+import gc
+import tracemalloc
+
+from _common import load, offline_source  # first , it puts the checkout on `sys.path`
+from ezweb import EzSoup
+
+URL = "https://news.example.com/news/2021/10/story-number-{}"
+PAGES = 50
+FIELDS = ["title", "description", "date", "main_image", "possible_topics"]
+
+
+def retained_bytes(keep, pages: int = PAGES) -> int:
+    """The traced memory per page still allocated after `keep(page)` of `pages` pages"""
+    html = load("article.html")
+    source = offline_source(URL.format(0))
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        retained = []
+        for i in range(pages):
+            page = EzSoup(content=html, url=URL.format(i), source=source)
+            retained.append(keep(page))
+            del page
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (current - base) // pages
+
+
+def keep_page(page: EzSoup):
+    page.summary(FIELDS)
+    return page
+
+
+def keep_record(page: EzSoup):
+    return page.freeze(FIELDS)
+
+
+def main():
+    print(f"{PAGES} pages , fields : {FIELDS}")
+    print(f"EzSoup objects   : {retained_bytes(keep_page) // 1024} KB per page")
+    print(f"frozen records   : {retained_bytes(keep_record)} bytes per page")
+
+
+if __name__ == "__main__":
+    main()
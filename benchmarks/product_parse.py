@@ -0,0 +1,39 @@
+"""
+Per-page parse time of `EzProduct` before and after passing
+the fetched page directly (one download , one parse).
+
+Runs offline on `corpus/product.html` :
+
+    python benchmarks/product_parse.py
+"""
+from _common import load, timed  # first , it puts the checkout on `sys.path`
+from ezweb import EzProduct, EzSource
+from ezweb.utils.http import soup_of
+
+URL = "https://shop.example.com/product/blade-15-advanced"
+ROUNDS = 20
+
+
+def main():
+    html = load("product.html")
+    source = EzSource(URL)
+
+    def before():
+        # the old `EzProduct.__init__` : parse , serialize and parse again
+        content = str(soup_of(html))
+        EzProduct(URL, content=content, source=source).soup
+
+    def after():
+        EzProduct(URL, content=html, source=source).soup
+
+    def after_parsed():
+        EzProduct(URL, soup=soup_of(html), source=source).soup
+
+    print(f"page size : {len(html) // 1024} KB , median of {ROUNDS} rounds")
+    print(f"before (parse + str + parse) : {timed(before, ROUNDS)} ms")
+    print(f"after (content)              : {timed(after, ROUNDS)} ms")
+    print(f"after (pre-parsed soup)      : {timed(after_parsed, ROUNDS)} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+The `EzSoupHelper` queries that `EzProduct` properties make ,
+answered by the one-pass `SoupIndex` vs a tree walk (`select` / `find_all`) for each.
+
+Runs offline on `corpus/product.html` :
+
+    python benchmarks/selector_index.py
+"""
+from _common import load, timed  # first , it puts the checkout on `sys.path`
+from ezweb.utils.http import soup_of
+from ezweb.utils.souphelper import EzSoupHelper
+
+ROUNDS = 10
+CONTAINS = [
+    ("*", "class", "price"),
+    ("*", "id", "price"),
+    ("*", "class", "product"),
+    ("*", "id", "product"),
+    ("*", "class", "container"),
+    ("*", "class", "row"),
+    ("*", "class", "gallery"),
+    ("*", "class", "item"),
+    ("*", "class", "post"),
+    ("*", "id", "breadcrumb"),
+    ("*", "class", "breadcrumb"),
+    ("div", "class", "cat"),
+    ("div", "class", "tag"),
+    ("div", "class", "label"),
+    ("link", "rel", "icon"),
+    ("a", "href", "tel:"),
+]
+ALL = ["a", "h2", "h3", "li", "img", "nav", "footer", "table", "article"]
+
+
+def main():
+    soup = soup_of(load("product.html"))
+    print(f"{len(soup.find_all(True))} elements , {len(CONTAINS) + len(ALL)} queries")
+
+    def tree_walks():
+        for tag, attr, value in CONTAINS:
+            soup.select(f'{tag}[{attr}*="{value}"]')
+        for name in ALL:
+            soup.find_all(name)
+
+    def indexed():
+        # a new helper each round , so the index build is counted too
+        helper = EzSoupHelper(soup, "https://shop.example.com")
+        for tag, attr, value in CONTAINS:
+            helper.contains(tag, attr, value)
+        for name in ALL:
+            helper.all(name)
+
+    print(f"tree walks : {timed(tree_walks, ROUNDS)} ms")
+    print(f"index      : {timed(indexed, ROUNDS)} ms")
+
+
+if __name__ == "__main__":
+    main()
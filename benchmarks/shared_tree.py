@@ -0,0 +1,32 @@
+"""
+Text extraction time of the default mode (every extractor parses the HTML itself)
+vs the `shared_tree` mode (one lxml parse , one trafilatura run).
+
+Runs offline on `corpus/article.html` :
+
+    python benchmarks/shared_tree.py
+"""
+from _common import load, offline_source, timed  # first , it puts the checkout on `sys.path`
+from ezweb import EzSoup
+
+URL = "https://news.example.com/news/2021/10/city-council-approves-new-housing-plan"
+ROUNDS = 5
+PROPERTIES = ["main_text", "main_text_without_comments", "comments_text", "last_date", "title"]
+
+
+def main():
+    html = load("article.html")
+    source = offline_source(URL)
+    for shared_tree in (False, True):
+
+        def run():
+            page = EzSoup(content=html, url=URL, source=source, shared_tree=shared_tree)
+            for name in PROPERTIES:
+                getattr(page, name)
+
+        mode = "shared_tree" if shared_tree else "default"
+        print(f"{mode:<12}: {timed(run, ROUNDS)} ms for {', '.join(PROPERTIES)}")
+
+
+if __name__ == "__main__":
+    main()
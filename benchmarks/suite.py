@@ -0,0 +1,266 @@
+"""
+The benchmark suite , runs offline over the corpus (served by `_server.CorpusAdapter`) and
+writes the results as JSON so two versions can be compared :
+
+    python benchmarks/suite.py --output before.json
+    # ... change ezweb ...
+    python benchmarks/suite.py --output after.json --compare before.json
+
+- per-property latency (median ms) of a fresh `EzSoup` , `EzProduct` and `EzSource`
+and the parses (BeautifulSoup , lxml , readability , trafilatura) each one triggers ,
+and of a metadata-only `summary(fields)`
+- end-to-end pages / second of `EzCrawler` and `EzFeedPoller`
+- peak memory (tracemalloc) of the scenarios and the memory per retained page
+(an `EzSoup` vs its `freeze` record)
+- requests and bytes served by the stand-in
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+from _common import count_parses, load, timed  # first , it puts the checkout on `sys.path`
+import ezweb.utils.http
+from ezweb import EzCrawler, EzFeedPoller, EzProduct, EzSoup, EzSource
+from _server import serve_corpus
+from memory import keep_page, keep_record, retained_bytes
+
+ARTICLE_URL = "https://news.example.com/news/2021/10/city-council-approves-new-housing-plan"
+PRODUCT_URL = "https://news.example.com/product/blade-15-advanced"
+HOME_URL = "https://news.example.com"
+
+SOUP_PROPERTIES = [
+    "soup",
+    "main_text",
+    "title",
+    "last_date",
+    "title_tag_text",
+    "meta_description",
+    "main_image_src",
+    "topic_names",
+    "important_hrefs",
+    "summary_dict",
+]
+PRODUCT_PROPERTIES = [
+    "title",
+    "second_title",
+    "price",
+    "brand",
+    "images_src",
+    "specs",
+    "summary_dict",
+]
+SOURCE_PROPERTIES = [
+    "name",
+    "description",
+    "language",
+    "favicon_href",
+    "rss_feed_url",
+    "rss_links",
+    "site_map_url",
+    "summary_dict",
+]
+
+# summary fields read in the `metadata_only` mode
+SOUP_METADATA_FIELDS = ["description", "meta_image_src", "meta_article_published_time"]
+PRODUCT_METADATA_FIELDS = ["id_sku_or_mpn", "low_price", "high_price", "brand"]
+
+def reset_caches():
+    """Forgets what the previous round has memoized at the process level"""
+    EzSource.registry.clear()
+    EzSource.no_feed_hosts.clear()
+    EzSource.site_maps_of_hosts.clear()
+    ezweb.utils.http._parsed_responses.clear()
+
+
+def peak_memory(func) -> float:
+    """Runs `func()` once and returns its peak traced memory in MB"""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024 ** 2, 2)
+
+
+def bench_properties(make, properties, rounds):
+    results = {}
+    for name in properties:
+        counts = Counter()
+
+        def run():
+            reset_caches()
+            with count_parses() as c:
+                getattr(make(), name)
+            counts.clear()
+            counts.update(c)
+
+        results[name] = {"ms": timed(run, rounds), "parses": dict(counts)}
+    return results
+
+
+def bench_soup(rounds):
+    html = load("article.html")
+    source = EzSource(ARTICLE_URL)
+    # the source properties are measured by `bench_source`
+    source.soup = ezweb.utils.http.soup_of(load("home.html"))
+    make = lambda: EzSoup(content=html, url=ARTICLE_URL, source=source)
+    return {
+        "properties": bench_properties(make, SOUP_PROPERTIES, rounds),
+        "metadata_summary_ms": timed(lambda: make().summary(SOUP_METADATA_FIELDS), rounds),
+        "peak_memory_mb": peak_memory(lambda: make().summary_dict),
+    }
+
+
+def bench_product(rounds):
+    html = load("product.html")
+    source = EzSource(PRODUCT_URL)
+    source.soup = ezweb.utils.http.soup_of(load("home.html"))
+    make = lambda: EzProduct(PRODUCT_URL, content=html, source=source)
+    return {
+        "properties": bench_properties(make, PRODUCT_PROPERTIES, rounds),
+        "metadata_summary_ms": timed(
+            lambda: make().summary(PRODUCT_METADATA_FIELDS), rounds
+        ),
+        "peak_memory_mb": peak_memory(lambda: make().summary_dict),
+    }
+
+
+def bench_source(rounds):
+    # the homepage , robots.txt , feed and sitemaps come from the stand-in
+    make = lambda: EzSource(HOME_URL)
+
+    def make_head_only():
+        source = EzSource(HOME_URL)
+        source.head_only = True
+        return source
+
+    return {
+        "properties": bench_properties(make, SOURCE_PROPERTIES, rounds),
+        "head_only_properties": bench_properties(make_head_only, SOURCE_PROPERTIES, rounds),
+        "peak_memory_mb": peak_memory(lambda: make().summary_dict),
+    }
+
+
+def throughput(count_of, label):
+    reset_caches()
+    with count_parses() as counts:
+        start = time.perf_counter()
+        count = count_of()
+        elapsed = time.perf_counter() - start
+    return {
+        label: count,
+        "seconds": round(elapsed, 3),
+        f"{label}_per_second": round(count / elapsed, 2) if elapsed else None,
+        "parses": dict(counts),
+    }
+
+
+def bench_crawl(max_pages):
+    def crawl():
+        crawler = EzCrawler([HOME_URL], max_depth=2, max_pages=max_pages)
+        return sum(1 for _ in crawler.crawl())
+
+    result = throughput(crawl, "pages")
+    result["peak_memory_mb"] = peak_memory(crawl)
+    return result
+
+
+def bench_feed_poll():
+    def poll():
+        poller = EzFeedPoller([HOME_URL + "/rss"])
+        return sum(1 for page in poller.poll_once() if page.title is not None)
+
+    result = throughput(poll, "pages")
+    result["peak_memory_mb"] = peak_memory(poll)
+    return result
+
+
+def bench_sitemap():
+    def walk():
+        return sum(1 for _ in EzSource(HOME_URL).iter_site_map_links())
+
+    result = throughput(walk, "links")
+    result["peak_memory_mb"] = peak_memory(walk)
+    return result
+
+
+def run(rounds: int, max_pages: int, latency: float) -> dict:
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rounds": rounds,
+            "latency": latency,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+    }
+    with serve_corpus(latency) as standin:
+        results["EzSoup"] = bench_soup(rounds)
+        results["EzProduct"] = bench_product(rounds)
+        results["EzSource"] = bench_source(rounds)
+        results["crawl"] = bench_crawl(max_pages)
+        results["feed_poll"] = bench_feed_poll()
+        results["sitemap"] = bench_sitemap()
+        results["retained_per_page"] = {
+            "ezsoup_bytes": retained_bytes(keep_page),
+            "frozen_bytes": retained_bytes(keep_record),
+        }
+        results["requests"] = dict(standin.requests)
+        results["bytes_served"] = standin.bytes_served
+    return results
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """`{"EzSoup.properties.title.ms": 1.2 , ...}` of the numeric results"""
+    flat = {}
+    for key, value in results.items():
+        if key == "meta":
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(new: dict, old: dict):
+    """Prints the timing and memory metrics that moved more than 10%"""
+    new, old = flatten(new), flatten(old)
+    for name in sorted(new.keys() & old.keys()):
+        if not name.endswith(("ms", "seconds", "_per_second", "peak_memory_mb", "_bytes")):
+            continue
+        before, after = old[name], new[name]
+        if not before or not after:
+            continue
+        ratio = after / before
+        if abs(ratio - 1) > 0.1:
+            print(f"{name:<55}{before:>10} -> {after:<10} ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="a previous results JSON file")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--max-pages", type=int, default=50)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to each request"
+    )
+    args = parser.parse_args()
+
+    results = run(args.rounds, args.max_pages, args.latency)
+    Path(args.output).write_text(json.dumps(results, indent=2))
+    print(f"results written to {args.output}")
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
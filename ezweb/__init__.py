@@ -1 +1,2 @@
-from ezweb.objects import EzSoup , EzSource , EzProduct
\ No newline at end of file
+from ezweb.objects import EzSoup , EzSource , EzProduct , EzCrawler , EzFeedPoller
+from ezweb.extract import extract_many
@@ -0,0 +1,293 @@
+import logging
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, Iterator, List, Tuple, Union
+
+#
+from ezweb.objects import EzSoup, EzProduct, EzSource
+from ezweb.utils.http import get_page, url_host
+from ezweb.utils.scheduler import CrawlError, crawl_map
+
+
+logger = logging.getLogger(__name__)
+
+KINDS = {"article": EzSoup, "product": EzProduct}
+
+
+def summary_of(
+    content: str,
+    url: str = None,
+    kind: str = "article",
+    topics: List[str] = None,
+    site_name: str = None,
+) -> dict:
+    """
+    Builds the `kind` page from its HTML and returns its page-local summary fields ,
+    a plain dict so it can be returned from a worker process.
+
+    The `"source"` field is left out and the source name is the given `site_name` ,
+    so a worker process doesn't fetch the homepage , robots.txt , RSS and sitemap itself
+    """
+    page = KINDS[kind](content=content, url=url, topics=topics)
+    page.__dict__["site_name"] = site_name
+    fields = [field for field in page.summary_fields if field != "source"]
+    return page.summary(fields)
+
+
+def iter_process_summaries(
+    pages: Iterable[Tuple[str, List[str]]],
+    kind: str = "article",
+    processes: int = None,
+    max_workers: int = None,
+) -> Iterator[Union[dict, CrawlError]]:
+    """
+    Fetches the `(url, topics)` pages with I/O threads and ships their raw HTML
+    to a `ProcessPoolExecutor` that does the CPU-bound parsing and extraction ,
+    yields the summaries as they complete (or a `CrawlError` of a page that couldn't be
+    fetched or extracted)
+
+    The workers are spawned (not forked) so they don't share the open connections
+    and the response cache of this process , each one makes its own session.
+    The source of the pages (`EzSource.of`) is fetched by the I/O threads of this process ,
+    once per host , and its summary is filled in here (`None` if it's unreachable).
+
+    ## Parameters :
+    `processes` :
+    the worker processes count , all the CPU cores by default
+
+    `max_workers` :
+    the fetching threads count
+    """
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {list(KINDS)}")
+    pages = list(pages)
+    with_source = "source" in KINDS[kind].summary_fields
+    # host -> source summary (`None` if unreachable) , computed once per host
+    source_summaries = {}
+    host_locks = {}
+    locks_lock = threading.Lock()
+
+    def source_summary(url):
+        host = url_host(url)
+        with locks_lock:
+            lock = host_locks.setdefault(host, threading.Lock())
+        # the other pages of the host wait for the first one instead of fetching it again
+        with lock:
+            if host not in source_summaries:
+                source = EzSource.of(url)
+                try:
+                    summary = source.summary_dict if with_source else {"name": source.name}
+                except Exception as e:
+                    logger.warning(f"process extraction : source of {host} failed : {e!r}")
+                    summary = None
+                source_summaries[host] = summary
+            return source_summaries[host]
+
+    def fetch(page):
+        url, _ = page
+        content = get_page(url, log_name="process extraction").text
+        return content, source_summary(url)
+
+    def result_of(future, source):
+        url = pending.pop(future)
+        if future.exception() is not None:
+            return CrawlError(url, future.exception())
+        summary = future.result()
+        if not with_source:
+            return summary
+        # the fields in their `summary_fields` order
+        return {
+            field: source if field == "source" else summary[field]
+            for field in KINDS[kind].summary_fields
+        }
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        # future -> page URL
+        pending = {}
+        # future -> source summary
+        sources = {}
+        fetched = crawl_map(fetch, pages, key=lambda p: p[0], max_workers=max_workers)
+        for (url, topics), result, error in fetched:
+            if error:
+                yield CrawlError(url, error)
+                continue
+            content, source = result
+            site_name = source and source.get("name")
+            future = pool.submit(summary_of, content, url, kind, topics, site_name)
+            pending[future] = url
+            sources[future] = source
+            # yield the finished ones while the others are still fetching
+            for future in [f for f in pending if f.done()]:
+                yield result_of(future, sources.pop(future))
+        for future in as_completed(list(pending)):
+            yield result_of(future, sources.pop(future))
+
+
+_DONE = object()
+# returned by `_get` when the consumer has stopped , `None` is a (malformed) item
+_STOPPED = object()
+
+
+def _is_url(item: str) -> bool:
+    item = item.strip()
+    return item.startswith(("http://", "https://")) and not any(c.isspace() for c in item)
+
+
+def _put(q: queue.Queue, item, stop: threading.Event):
+    # a bounded put that gives up when the consumer has stopped
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    # returns `_STOPPED` when the consumer has stopped
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _STOPPED
+
+
+def extract_many(
+    items: Iterable[Union[str, Tuple[str, str]]],
+    kind: str = "article",
+    fields: List[str] = None,
+    fetch_workers: int = 16,
+    extract_workers: int = 4,
+    queue_size: int = 64,
+) -> Iterator[dict]:
+    """
+    Extracts many pages through a fetch -> parse -> extract pipeline
+    and yields each result as soon as it's ready (not in the input order)
+
+    ## Parameters :
+    `items` :
+    page URLs , raw HTML strings or `(html, url)` tuples , it can be a lazy iterator
+
+    `kind` :
+    `"article"` (`EzSoup`) or `"product"` (`EzProduct`)
+
+    `fields` :
+    the summary fields to compute (e.g. `["title", "price", "source.name"]`) ,
+    the whole `summary_dict` if `None` (see `EzSoup.summary`)
+
+    `fetch_workers` , `extract_workers` :
+    threads of each stage
+
+    `queue_size` :
+    the bound of the queues between the stages , so a slow stage holds back the others
+    instead of buffering the whole batch
+
+    Each result has the page `url` (if any) and the fields ,
+    or an `error` key if the page couldn't be fetched or extracted (or the item is malformed).
+    An exception of the `items` iterator is raised here.
+    The pages of a host share one `EzSource`.
+
+    ## Example :
+    ```python
+    for result in extract_many(urls, kind="product", fields=["title", "price"]):
+        print(result)
+    ```
+    """
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {list(KINDS)}")
+    ez_class = KINDS[kind]
+    stop = threading.Event()
+    to_fetch = queue.Queue(maxsize=queue_size)
+    to_extract = queue.Queue(maxsize=queue_size)
+    results = queue.Queue(maxsize=queue_size)
+
+    def feed():
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                _put(to_fetch, item, stop)
+        except Exception as e:
+            # raised to the consumer
+            _put(results, e, stop)
+        finally:
+            for _ in range(fetch_workers):
+                _put(to_fetch, _DONE, stop)
+
+    fetchers_left = [fetch_workers]
+    fetchers_lock = threading.Lock()
+
+    def fetch():
+        while True:
+            item = _get(to_fetch, stop)
+            if item is _STOPPED:
+                return
+            if item is _DONE:
+                with fetchers_lock:
+                    fetchers_left[0] -= 1
+                    last = fetchers_left[0] == 0
+                if last:
+                    # the last fetcher tells every extractor that there's nothing more
+                    for _ in range(extract_workers):
+                        _put(to_extract, _DONE, stop)
+                return
+            html, url = None, None
+            try:
+                if isinstance(item, tuple):
+                    html, url = item
+                elif not isinstance(item, str):
+                    raise TypeError(
+                        f"expected a URL , an HTML string or an (html , url) tuple , got {item!r}"
+                    )
+                elif _is_url(item):
+                    html, url = None, item
+                else:
+                    html, url = item, None
+                if html is None:
+                    html = get_page(url, log_name="extract_many").text
+            except Exception as e:
+                _put(results, {"url": url, "error": repr(e)}, stop)
+                continue
+            _put(to_extract, (html, url), stop)
+
+    def extract():
+        while True:
+            item = _get(to_extract, stop)
+            if item is _STOPPED:
+                return
+            if item is _DONE:
+                _put(results, _DONE, stop)
+                return
+            html, url = item
+            try:
+                source = EzSource.of(url) if url else None
+                page = ez_class(content=html, url=url, source=source)
+                result = page.summary(fields)
+                if url:
+                    result = {"url": url, **result}
+            except Exception as e:
+                result = {"url": url, "error": repr(e)}
+            _put(results, result, stop)
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    threads += [threading.Thread(target=fetch, daemon=True) for _ in range(fetch_workers)]
+    threads += [threading.Thread(target=extract, daemon=True) for _ in range(extract_workers)]
+    for t in threads:
+        t.start()
+
+    finished = 0
+    try:
+        while finished < extract_workers:
+            result = results.get()
+            if result is _DONE:
+                finished += 1
+                continue
+            if isinstance(result, Exception):
+                raise result
+            yield result
+    finally:
+        stop.set()
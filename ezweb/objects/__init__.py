@@ -1,3 +1,5 @@
 from ezweb.objects.soup import EzSoup
 from ezweb.objects.source import EzSource
-from ezweb.objects.product import EzProduct
\ No newline at end of file
+from ezweb.objects.product import EzProduct
+from ezweb.objects.crawler import EzCrawler
+from ezweb.objects.poller import EzFeedPoller
@@ -0,0 +1,187 @@
+import heapq
+import os
+import pickle
+from typing import Callable, Iterator, List
+
+#
+from ezweb.objects.soup import EzSoup
+from ezweb.utils.bloom import BloomFilter
+from ezweb.utils.http import normalize_url, url_host
+from ezweb.utils.scheduler import crawl_map
+
+
+class EzCrawler:
+    """
+    A breadth-first crawler that follows the links of the crawled pages
+
+    ## Parameters :
+    `start_urls` :
+    the URLs of depth 0
+
+    `max_depth` , `max_pages` :
+    the crawl budget , links deeper than `max_depth` aren't queued
+    and the crawl stops after `max_pages` crawled pages
+
+    `same_host` :
+    follow just the links of the start URLs hosts
+
+    `priority` :
+    `priority(url, depth, is_important) -> float` , the higher ones of a depth are crawled first ,
+    by default the `important_hrefs` of a page come before its other internal links
+
+    `seen_capacity` , `seen_error_rate` :
+    size of the seen-set (a Bloom filter) of the normalized URLs
+
+    `checkpoint_path` :
+    the crawl state is saved to this file every `checkpoint_every` pages
+    and the crawl is resumed from it if it exists
+
+    ## Example :
+    ```python
+    crawler = EzCrawler(["https://www.example.com"], max_depth=3, checkpoint_path="crawl.ckpt")
+    for page in crawler.crawl():
+        print(page.url, page.title)
+    ```
+    """
+
+    def __init__(
+        self,
+        start_urls: List[str],
+        max_depth: int = 2,
+        max_pages: int = 1000,
+        same_host: bool = True,
+        priority: Callable[[str, int, bool], float] = None,
+        seen_capacity: int = 10_000_000,
+        seen_error_rate: float = 0.01,
+        checkpoint_path: str = None,
+        checkpoint_every: int = 100,
+        max_workers: int = 16,
+        ez_soup_class=EzSoup,
+    ) -> None:
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.same_host = same_host
+        self.priority = priority or self._default_priority
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.max_workers = max_workers
+        self.ez_soup_class = ez_soup_class
+
+        self.hosts = {self._host(u) for u in start_urls}
+        self.seen = BloomFilter(seen_capacity, seen_error_rate)
+        self.frontier = []
+        self.pages_crawled = 0
+        self.errors = 0
+        self._seq = 0
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            self._load_checkpoint()
+        else:
+            for url in start_urls:
+                self.push(url, 0)
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return (url_host(url) or "").replace("www.", "")
+
+    @staticmethod
+    def _default_priority(url: str, depth: int, is_important: bool) -> float:
+        return 1.0 if is_important else 0.0
+
+    def push(self, url: str, depth: int, is_important: bool = True) -> bool:
+        """Queues the `url` if it's new and in the crawl scope"""
+        if depth > self.max_depth:
+            return False
+        if self.same_host and self._host(url) not in self.hosts:
+            return False
+        url = normalize_url(url)
+        if not self.seen.add(url):
+            return False
+        priority = self.priority(url, depth, is_important)
+        heapq.heappush(self.frontier, (depth, -priority, self._seq, url))
+        self._seq += 1
+        return True
+
+    def _pop_batch(self, size: int) -> List[tuple]:
+        """Pops the frontier entries of the next batch"""
+        batch = []
+        while self.frontier and len(batch) < size:
+            batch.append(heapq.heappop(self.frontier))
+        return batch
+
+    def _fetch(self, entry: tuple):
+        # the page is parsed for its links here in the worker thread , not by the consumer
+        depth, _, _, url = entry
+        page = self.ez_soup_class(url=url)
+        links = self._links_of(page) if depth < self.max_depth else ([], [])
+        return page, links
+
+    def _links_of(self, page: EzSoup):
+        try:
+            important = page.important_hrefs or []
+        except (IndexError, TypeError):
+            # a page without any important link
+            important = []
+        return important, page.a_tag_hrefs_internal or []
+
+    def crawl(self) -> Iterator[EzSoup]:
+        """Yields the crawled pages as they complete"""
+        since_checkpoint = 0
+        # the popped entries that aren't crawled yet
+        in_flight = set()
+        try:
+            while self.frontier and self.pages_crawled < self.max_pages:
+                budget = self.max_pages - self.pages_crawled
+                batch = self._pop_batch(min(self.max_workers * 2, budget))
+                in_flight.update(batch)
+                results = crawl_map(
+                    self._fetch, batch, key=lambda entry: entry[3], max_workers=self.max_workers
+                )
+                for entry, result, error in results:
+                    in_flight.discard(entry)
+                    if error:
+                        self.errors += 1
+                        continue
+                    page, (important, internal) = result
+                    depth = entry[0]
+                    self.pages_crawled += 1
+                    since_checkpoint += 1
+                    for link in important:
+                        self.push(link, depth + 1, True)
+                    for link in internal:
+                        self.push(link, depth + 1, False)
+                    yield page
+                if self.checkpoint_path and since_checkpoint >= self.checkpoint_every:
+                    self.save_checkpoint()
+                    since_checkpoint = 0
+        finally:
+            # a crawl that is stopped early resumes them
+            for entry in in_flight:
+                heapq.heappush(self.frontier, entry)
+            if self.checkpoint_path:
+                self.save_checkpoint()
+
+    def save_checkpoint(self):
+        state = {
+            "hosts": self.hosts,
+            "seen": self.seen,
+            "frontier": self.frontier,
+            "pages_crawled": self.pages_crawled,
+            "errors": self.errors,
+            "seq": self._seq,
+        }
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # atomic , a crash while saving keeps the previous checkpoint
+        os.replace(tmp, self.checkpoint_path)
+
+    def _load_checkpoint(self):
+        with open(self.checkpoint_path, "rb") as f:
+            state = pickle.load(f)
+        self.hosts = state["hosts"]
+        self.seen = state["seen"]
+        self.frontier = state["frontier"]
+        self.pages_crawled = state["pages_crawled"]
+        self.errors = state["errors"]
+        self._seq = state["seq"]
@@ -0,0 +1,177 @@
+import heapq
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from feedparser.util import FeedParserDict
+
+#
+from ezweb.objects.soup import EzSoup
+from ezweb.objects.source import EzSource
+from ezweb.utils.feeds import FeedState, fetch_feed
+from ezweb.utils.scheduler import crawl_map
+
+
+class EzFeedPoller:
+    """
+    Polls the RSS feeds of many sources on a schedule and builds just the new entries ,
+    the feeds are fetched with conditional requests (`ETag` / `Last-Modified`)
+    so an unchanged feed is a `304` without a body and isn't parsed at all
+
+    ## Parameters :
+    `feeds` :
+    feed URLs or `EzSource`s (their `rss_feed_url` is discovered on the first poll)
+
+    `interval` :
+    seconds between two polls of a feed , `add` can set it for each feed
+
+    `state` :
+    a `FeedState` (or its SQLite file path) that keeps the feed validators and the seen entries
+    (GUIDs or links) , an in-memory one by default
+
+    `backfill` :
+    build the entries that already are in a feed on its first poll ,
+    otherwise they are just marked as seen
+
+    ## Example :
+    ```python
+    poller = EzFeedPoller(["https://www.theverge.com/rss/index.xml", EzSource("https://www.bbc.com")],
+                          interval=120, state="~/.ezweb/feeds.sqlite")
+    for page in poller.run():
+        print(page.url, page.title)
+    ```
+    """
+
+    def __init__(
+        self,
+        feeds: Iterable[Union[str, EzSource]] = (),
+        interval: float = 300,
+        state: Union[str, FeedState] = None,
+        backfill: bool = True,
+        max_workers: int = 16,
+        ez_soup_class=EzSoup,
+    ) -> None:
+        if isinstance(state, str):
+            state = FeedState(state)
+        self.state = state or FeedState()
+        self.interval = interval
+        self.backfill = backfill
+        self.max_workers = max_workers
+        self.ez_soup_class = ez_soup_class
+        self.errors = 0
+        self._feeds: Dict[int, Tuple[Union[str, EzSource], float]] = {}
+        self._schedule = []
+        self._polled = set()
+        self._seq = 0
+        for feed in feeds:
+            self.add(feed)
+
+    def add(self, feed: Union[str, EzSource], interval: float = None, start: float = None):
+        """Schedules the `feed` every `interval` seconds , the first poll is at `start` (now by default)"""
+        feed_id = self._seq
+        self._seq += 1
+        self._feeds[feed_id] = (feed, interval or self.interval)
+        start = time.monotonic() if start is None else start
+        heapq.heappush(self._schedule, (start, feed_id))
+
+    @property
+    def next_poll_at(self) -> float:
+        """The (monotonic) time of the next due feed"""
+        return self._schedule[0][0] if self._schedule else float("inf")
+
+    def _due(self) -> List[int]:
+        now = time.monotonic()
+        due = []
+        while self._schedule and self._schedule[0][0] <= now:
+            _, feed_id = heapq.heappop(self._schedule)
+            due.append(feed_id)
+        return due
+
+    def _feed_url_of(self, feed_id: int) -> str:
+        feed, _ = self._feeds[feed_id]
+        return feed.url if isinstance(feed, EzSource) else feed
+
+    def _new_entries(
+        self, feed_id: int
+    ) -> Tuple[List[Tuple[FeedParserDict, EzSource]], Optional[Tuple[str, dict]]]:
+        """
+        Returns the new `(entry, source)`s of the feed and its `(feed_url, headers)`
+        to save the validators when those entries are built
+        """
+        feed, _ = self._feeds[feed_id]
+        if isinstance(feed, EzSource):
+            source, feed_url = feed, feed.rss_feed_url
+        else:
+            source, feed_url = EzSource.of(feed), feed
+        if not feed_url:
+            return [], None
+        data = fetch_feed(feed_url, self.state, save_validators=False)
+        if data is None:
+            return [], None
+        entries = [e for e in data.get("entries", []) if e.get("link")]
+        entries = [e for e in entries if self.state.is_new(e)]
+        if not self.backfill and feed_id not in self._polled:
+            for entry in entries:
+                self.state.mark(entry)
+            entries = []
+        self._polled.add(feed_id)
+        return [(entry, source) for entry in entries], (feed_url, data.headers)
+
+    def _build(self, item: Tuple[FeedParserDict, EzSource]) -> EzSoup:
+        entry, source = item
+        tags = [d.get("term") for d in entry.get("tags", [])]
+        return self.ez_soup_class(url=entry.link, topics=tags, source=source)
+
+    def poll_once(self) -> Iterator[EzSoup]:
+        """Polls the due feeds and yields the pages of their new entries as they complete"""
+        due = self._due()
+        new = []
+        # entry key -> the feeds that have it
+        feeds_of = defaultdict(set)
+        # feed id -> (feed url , response headers)
+        validators = {}
+        polled = crawl_map(
+            self._new_entries,
+            due,
+            key=self._feed_url_of,
+            max_workers=self.max_workers,
+        )
+        for feed_id, result, error in polled:
+            _, interval = self._feeds[feed_id]
+            heapq.heappush(self._schedule, (time.monotonic() + interval, feed_id))
+            if error:
+                self.errors += 1
+                continue
+            entries, validators[feed_id] = result
+            for entry, source in entries:
+                # the same entry can be in more than one feed
+                key = FeedState.entry_key(entry)
+                if key not in feeds_of:
+                    new.append((entry, source))
+                feeds_of[key].add(feed_id)
+
+        results = crawl_map(
+            self._build, new, key=lambda i: i[0].link, max_workers=self.max_workers
+        )
+        failed_feeds = set()
+        for (entry, _), page, error in results:
+            if error:
+                # it's not marked so it's tried again on the next poll
+                self.errors += 1
+                failed_feeds |= feeds_of[FeedState.entry_key(entry)]
+                continue
+            self.state.mark(entry)
+            yield page
+        # saved just when all the new entries are built ,
+        # otherwise the next poll would be a `304` and skip the failed ones
+        for feed_id, feed_validators in validators.items():
+            if feed_validators and feed_id not in failed_feeds:
+                self.state.set_validators(*feed_validators)
+        self.state.flush()
+
+    def run(self, stop: threading.Event = None) -> Iterator[EzSoup]:
+        """Polls the feeds on their schedule until `stop` is set , yields the new pages"""
+        stop = stop or threading.Event()
+        while not stop.is_set() and self._schedule:
+            yield from self.poll_once()
+            stop.wait(max(self.next_poll_at - time.monotonic(), 0))
@@ -1,22 +1,46 @@
 import json
 import re
 from typing import List, Union
+from bs4 import BeautifulSoup
 from bs4.element import Tag
+from requests import Response
 from trafilatura import extract
 from unidecode import unidecode
-from cached_property import cached_property
+import logging
 
 #
-from ezweb.objects import EzSoup
-from ezweb.utils.http import soup_from_url
+from ezweb.utils import metrics
+# reports the computing time of the properties to the metrics hooks
+from ezweb.utils.metrics import timed_cached_property as cached_property
+from ezweb.objects import EzSoup, EzSource
 from ezweb.utils.text import clean_title, similarity_of
+from ezweb.utils.fields import select_fields
+
+logger = logging.getLogger(__name__)
 
 
 class EzProduct(EzSoup):
-    def __init__(self, url: str) -> None:
-        soup = str(soup_from_url(url))
-        super().__init__(content=soup, url=url)
-        self.url = url
+    def __init__(
+        self,
+        url: str = None,
+        content: str = None,
+        source: EzSource = None,
+        topics: List[str] = None,
+        response: Response = None,
+        soup: BeautifulSoup = None,
+        shared_tree: bool = False,
+        metadata_only: bool = False,
+    ) -> None:
+        super().__init__(
+            content=content,
+            url=url,
+            source=source,
+            topics=topics,
+            response=response,
+            soup=soup,
+            shared_tree=shared_tree,
+            metadata_only=metadata_only,
+        )
 
     @cached_property
     def units(self):
@@ -64,9 +88,9 @@ class EzProduct(EzSoup):
         returns the lowest price if any discount
         or multiple seller option is provided
         """
-        return self.helper.from_structured_data("lowPrice") or self.helper.meta_content(
-            "name", "price"
-        )
+        return self.meta_helper.from_structured_data(
+            "lowPrice"
+        ) or self.meta_helper.meta_content("name", "price")
 
     @cached_property
     def high_price(self):
@@ -74,9 +98,9 @@ class EzProduct(EzSoup):
         returns the highest price if any discount
         or multiple seller option is provided
         """
-        return self.helper.from_structured_data(
+        return self.meta_helper.from_structured_data(
             "highPrice"
-        ) or self.helper.meta_content("name", "old-price")
+        ) or self.meta_helper.meta_content("name", "old-price")
 
     @cached_property
     def has_discount(self):
@@ -92,7 +116,7 @@ class EzProduct(EzSoup):
     @cached_property
     def availablity(self):
         """Returns structured data availability"""
-        return self.helper.from_structured_data("availability")
+        return self.meta_helper.from_structured_data("availability")
 
     @cached_property
     def is_available(self):
@@ -103,7 +127,7 @@ class EzProduct(EzSoup):
 
     @cached_property
     def brand(self):
-        b = self.helper.application_json.get("brand")
+        b = self.meta_helper.application_json.get("brand")
         if not b:
             return
         if isinstance(b, str):
@@ -112,24 +136,28 @@ class EzProduct(EzSoup):
 
     @cached_property
     def structured_id(self):
-        sku = self.helper.from_structured_data("sku")
-        mpn = self.helper.from_structured_data("mpn")
+        sku = self.meta_helper.from_structured_data("sku")
+        mpn = self.meta_helper.from_structured_data("mpn")
         return sku or mpn
 
     @cached_property
     def main_text(self):
+        if self.shared_tree:
+            return extract(self._lxml_tree_copy())
+        metrics.note_parse("trafilatura")
         return extract(self.content)
 
     @cached_property
     def short_description(self):
-        return self.helper.from_structured_data("description") or self.meta_description
+        return (
+            self.meta_helper.from_structured_data("description") or self.meta_description
+        )
 
     @cached_property
     def second_title(self):
         sc_title = self.helper.from_structured_data("alternateName")
-        print(sc_title)
         if sc_title and isinstance(sc_title, str):
-            return clean_title(sc_title, self.site_name)
+            return clean_title(sc_title, self.title_site_name)
         h1 = self.card.find("h1")
         els = [self.card.find("h2")] + (h1.find_all() if h1 else [])
         els = [i for i in els if i is not None]
@@ -160,7 +188,7 @@ class EzProduct(EzSoup):
         if not el:
             return None
 
-        result = clean_title(el.text, self.source.name)
+        result = clean_title(el.text, self.title_site_name)
         # check sim again since even the sorted list el can be a bad value
         sim = similarity_of(result, title)
         if sim > 95 or sim < 49:
@@ -170,12 +198,12 @@ class EzProduct(EzSoup):
 
     @cached_property
     def structured_price(self):
-        price = self.helper.from_structured_data("price") or self.low_price
+        price = self.meta_helper.from_structured_data("price") or self.low_price
         return price
 
     @cached_property
     def meta_price(self):
-        return self.helper.meta_content("property", "product:price:amount")
+        return self.meta_helper.meta_content("property", "product:price:amount")
 
     @cached_property
     def price_number(self):
@@ -265,14 +293,16 @@ class EzProduct(EzSoup):
                 return numbers[-1], unit
         return _none
 
+    provider_fields = {
+        "name": lambda self: self.site_name,
+        "domain": lambda self: self.source.domain if self.source else None,
+        "addresses": lambda self: self.addresses,
+        "phone": lambda self: self.phones,
+    }
+
     @cached_property
     def provider_info(self):
-        return {
-            "name": self.source.name,
-            "domain": self.source.domain,
-            "addresses": self.addresses,
-            "phone": self.phones,
-        }
+        return select_fields(self, self.provider_fields)
 
     @cached_property
     def addresses(self):
@@ -374,7 +404,7 @@ class EzProduct(EzSoup):
 
         high_score_count = len(list(filter(lambda x: x >= 15, product_related_scores)))
         if not high_score_count:
-            print("checking the low-level containers for the card...", end=" ")
+            logger.debug("checking the low-level containers for the card...")
             product_related_scores.clear()
             els = c("class", "container") + c("class", "row")
             most_content_product_el = sorted(els, key=lambda t: main_card_criterion(t))[
@@ -384,9 +414,9 @@ class EzProduct(EzSoup):
                 list(filter(lambda x: x >= 15, product_related_scores))
             )
             if high_score_count:
-                print(f"now seems {high_score_count} element(s) have/has a good score")
+                logger.debug("now seems %s element(s) have/has a good score", high_score_count)
             else:
-                print("couldn't find a main card tag again !")
+                logger.debug("couldn't find a main card tag again !")
 
         return most_content_product_el
 
@@ -394,26 +424,53 @@ class EzProduct(EzSoup):
     def specs(self):
         return self.specs_from_text + self.helper.table_info
 
+    # summary field -> getter , see `EzSoup.summary`
+    summary_fields = {
+        "provider": lambda self: self.provider_info,
+        "url": lambda self: self.url,
+        "id_sku_or_mpn": lambda self: self.structured_id,
+        "title": lambda self: self.title,
+        "second_title": lambda self: self.second_title,
+        "is_available": lambda self: self.is_available,
+        "low_price": lambda self: self.low_price,
+        "high_price": lambda self: self.high_price,
+        "has_discount": lambda self: self.has_discount,
+        "discount_percentage": lambda self: self.discount_percentage,
+        "price": lambda self: self.price,
+        "brand": lambda self: self.brand,
+        "images": lambda self: self.images_src,
+        "specs": lambda self: self.specs,
+        "possible_topics": lambda self: self.helper.possible_topic_names,
+    }
+    summary_nested = {
+        "provider": lambda self, fields: select_fields(self, self.provider_fields, fields),
+    }
+    # see `EzSoup.metadata_fields` , these come from the meta tags and the structured data
+    metadata_fields = {
+        "url",
+        "id_sku_or_mpn",
+        "is_available",
+        "low_price",
+        "high_price",
+        "has_discount",
+        "discount_percentage",
+        "brand",
+        "structured_id",
+        "structured_price",
+        "availablity",
+        "meta_price",
+        "meta_description",
+        "meta_image_src",
+        "short_description",
+    }
+
+    def summary(self, fields: List[str] = None) -> dict:
+        self._check_metadata_only(fields)
+        return select_fields(self, self.summary_fields, fields, self.summary_nested)
+
     @cached_property
     def summary_dict(self):
-        obj = {
-            "provider": self.provider_info,
-            "url": self.url,
-            "id_sku_or_mpn": self.structured_id,
-            "title": self.title,
-            "second_title": self.second_title,
-            "is_available": self.is_available,
-            "low_price": self.low_price,
-            "high_price": self.high_price,
-            "has_discount": self.has_discount,
-            "discount_percentage": self.discount_percentage,
-            "price": self.price,
-            "brand": self.brand,
-            "images": self.images_src,
-            "specs": self.specs,
-            "possible_topics": self.helper.possible_topic_names,
-        }
-        return obj
+        return self.summary()
 
     @cached_property
     def json_summary(self):
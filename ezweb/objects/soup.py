@@ -1,17 +1,30 @@
 from collections import Counter
+from copy import deepcopy
+from functools import partial
 import json
-from typing import List
+from typing import AsyncIterator, Iterator, List, Union
+from bs4 import BeautifulSoup
 from bs4.element import Tag
+from lxml.html import HtmlElement
+from requests import Response
 from dateutil.parser import parse as date_parse
 import trafilatura
 import readability
-from concurrent.futures import ThreadPoolExecutor
-from cached_property import cached_property
+import logging
 
 #
+from ezweb.utils import metrics
+# reports the computing time of the properties to the metrics hooks
+from ezweb.utils.metrics import timed_cached_property as cached_property
 from ezweb.utils.http import (
-    safe_get,
+    HTML_CONTENT_TYPES,
+    MAX_PAGE_BYTES,
+    get_page,
+    head_soup_of,
     soup_of,
+    soup_of_response,
+    lxml_tree_of,
+    name_from_url,
     pure_url,
     url_host,
 )
@@ -19,6 +32,16 @@ from ezweb.utils.text import similarity_of, clean_title
 from ezweb.utils.souphelper import EzSoupHelper
 from ezweb.objects.source import EzSource
 from ezweb.utils.io import create_file
+from ezweb.utils.fields import FrozenRecord, freeze, select_fields
+from ezweb.utils.ahttp import (
+    AsyncEzSession,
+    async_crawl_map,
+    async_safe_get,
+    run_blocking,
+)
+from ezweb.utils.scheduler import CrawlError, crawl_map
+
+logger = logging.getLogger(__name__)
 
 
 class EzSoup:
@@ -28,24 +51,129 @@ class EzSoup:
         url: str = None,
         source: EzSource = None,
         topics: List[str] = None,
+        response: Response = None,
+        soup: BeautifulSoup = None,
+        shared_tree: bool = False,
+        metadata_only: bool = False,
     ) -> None:
+        """
+        ## Parameters :
+        `content` , `url` :
+        the page HTML and/or URL , the page is fetched if only `url` is determined
+
+        `response` :
+        an already fetched response of the page (`requests.Response`) to not fetch it again
+
+        `soup` :
+        an already parsed tree of the page to not parse it again
+
+        `shared_tree` :
+        parse the page once by `lxml` and feed copies of that tree to trafilatura and readability ,
+        `main_text` , `comments_text` and `last_date` come from one trafilatura run
+        (`trafilatura_bare_extract` is extracted without tables in this mode)
+
+        `metadata_only` :
+        read the metadata properties (`meta_*` , structured data) from a tree of just
+        the `<head>` and the JSON-LD scripts , see `meta_helper`.
+        It's set by `summary(fields)` when all the `fields` are `metadata_fields`
+        """
         assert (
-            content or url
+            content or url or response is not None or soup is not None
         ), "At least one of page HTML content or page URL must be determined"
-        if not content:
-            self.content = safe_get(url, log_name="EzSoup initial").text
-        else:
+        if not content and soup is None and response is None:
+            response = get_page(url, log_name="EzSoup initial")
+        if response is not None:
+            content = content or response.text
+            url = url or response.url
+            # kept just to reuse its memoized tree (if it's a cached response)
+            if self.shared_soups and hasattr(response, "from_cache"):
+                self._response = response
+        if content:
             self.content = content
-        if url:
-            self.source = source or EzSource(url)
-
-        self.soup = soup_of(self.content)
-        self.helper = EzSoupHelper(self.soup, url=url)
+        if soup is not None:
+            self.soup = soup
+        # an HTML-only page has no source
+        self.source = source or (EzSource.of(url) if url else None)
 
         # Initilizing some containers to avoid recalculate -
         # pre-determined arguments
         self.url = url
         self._topics = topics
+        self.shared_tree = shared_tree
+        self.metadata_only = metadata_only
+
+    @classmethod
+    async def afrom_url(
+        cls,
+        url: str,
+        source: EzSource = None,
+        topics: List[str] = None,
+        session: AsyncEzSession = None,
+        executor=None,
+    ):
+        """
+        Async constructor , fetches `url` with the async HTTP client
+        and builds the instance (parsing) in `executor`
+        (the loop default executor if `None`) to not block the event loop
+
+        ```python
+        page = await EzSoup.afrom_url(url)
+        ```
+        """
+        response = await async_safe_get(
+            url, session=session, max_bytes=MAX_PAGE_BYTES, content_types=HTML_CONTENT_TYPES
+        )
+        return await run_blocking(
+            executor,
+            partial(cls, content=response.text, url=url, source=source, topics=topics),
+        )
+
+    _response = None
+    # reuse the tree of a cached (or `304`) response among the instances ,
+    # just if their `soup` is read-only (see `soup_of_response`)
+    shared_soups = False
+
+    @cached_property
+    def content(self) -> str:
+        # just when the instance is made from an already parsed `soup`
+        return str(self.soup)
+
+    @cached_property
+    def soup(self) -> BeautifulSoup:
+        """
+        The BeautifulSoup tree of the page , built on the first access
+        since some properties (e.g. `main_text` , `title`) parse the HTML themselves
+        """
+        response, self._response = self._response, None
+        if response is not None:
+            return soup_of_response(response, shared=self.shared_soups)
+        return soup_of(self.content)
+
+    @cached_property
+    def helper(self) -> EzSoupHelper:
+        return EzSoupHelper(self.soup, url=self.url)
+
+    @cached_property
+    def meta_helper(self) -> EzSoupHelper:
+        """
+        The helper of the metadata properties , in `metadata_only` mode it's made from
+        `head_soup_of` the page (unless the whole `soup` is already built)
+        """
+        if not self.metadata_only:
+            return self.helper
+        return self.head_helper
+
+    @cached_property
+    def head_helper(self) -> EzSoupHelper:
+        """
+        The helper of `head_soup_of` the page , or `helper` if the whole `soup` is already built.
+        In `shared_tree` mode it's made from the `lxml_tree` so the page isn't parsed again
+        """
+        if "soup" in self.__dict__:
+            return self.helper
+        if self.shared_tree:
+            return EzSoupHelper(head_soup_of(self.lxml_tree), url=self.url)
+        return EzSoupHelper(head_soup_of(self.content), url=self.url)
 
     @cached_property
     def url_parts(self):
@@ -62,31 +190,78 @@ class EzSoup:
             return
         return "https://" + self.root_domain
 
+    @cached_property
+    def site_name(self):
+        return self.source.name if self.source else None
+
+    @cached_property
+    def title_site_name(self):
+        """
+        The site name that is cleaned from the titles , from the page itself or its host
+        (or the source name if it's already known) so a title doesn't fetch the source
+        """
+        page_site_name = clean_title(self.head_helper.meta_og_content("site_name"))
+        if page_site_name:
+            return page_site_name
+        if self.source and "name" in self.source.__dict__:
+            return self.source.name
+        return name_from_url(self.url) if self.url else None
+
     @cached_property
     def title_tag_text(self):
         tag = self.helper.first("title")
         if not tag:
             return None
-        return clean_title(tag.text, self.source.name)
+        return clean_title(tag.text, self.title_site_name)
 
     @cached_property
     def main_text(self):
+        if self.shared_tree:
+            text = self.main_text_without_comments
+            comments = self.comments_text
+            if text and comments:
+                return f"{text}\n{comments}"
+            return text or comments
+        metrics.note_parse("trafilatura")
         return trafilatura.extract(self.content, include_tables=False)
 
     @cached_property
     def main_text_without_comments(self):
+        if self.shared_tree:
+            return self.trafilatura_bare_extract.get("text")
+        metrics.note_parse("trafilatura")
         return trafilatura.extract(
             self.content, include_tables=False, include_comments=False
         )
 
+    @cached_property
+    def lxml_tree(self) -> HtmlElement:
+        """The page parsed once by `lxml` for the extractors in `shared_tree` mode"""
+        return lxml_tree_of(self.content)
+
+    def _lxml_tree_copy(self) -> HtmlElement:
+        # the extractors drop/clean nodes of the tree they get
+        return deepcopy(self.lxml_tree)
+
     @cached_property
     def readablity_document(self) -> readability.Document:
         """Returns `readability.Document` instance of this soup"""
+        if self.shared_tree:
+            return readability.Document(self._lxml_tree_copy())
+        metrics.note_parse("readability")
         return readability.Document(self.content)
 
     @cached_property
     def trafilatura_bare_extract(self):
         """Returns `trafilatura.bare_extraction`output (dict) of this.soup"""
+        if self.shared_tree:
+            # one run for `main_text` , `comments_text` and `last_date`
+            return trafilatura.bare_extraction(
+                self._lxml_tree_copy(),
+                include_tables=False,
+                date_extraction_params={"outputformat": "%Y-%m-%dT%H:%M:%S%z"},
+            ) or {}
+        metrics.note_parse("trafilatura")
         return trafilatura.bare_extraction(
             self.content, date_extraction_params={"outputformat": "%Y-%m-%dT%H:%M:%S%z"}
         )
@@ -109,18 +284,18 @@ class EzSoup:
 
     @cached_property
     def meta_description(self):
-        normal = self.helper.meta_content("name", "description")
-        og = self.helper.meta_og_content("description")
+        normal = self.meta_helper.meta_content("name", "description")
+        og = self.meta_helper.meta_og_content("description")
         return normal or og
 
     @cached_property
     def meta_image_src(self):
-        return self.helper.meta_og_content("image")
+        return self.meta_helper.meta_og_content("image")
 
     @cached_property
     def meta_article_published_time(self):
         try:
-            time = self.helper.meta_content("property", "article:published_time")
+            time = self.meta_helper.meta_content("property", "article:published_time")
             return date_parse(time)
         except Exception:
             return None
@@ -128,7 +303,7 @@ class EzSoup:
     @cached_property
     def meta_article_modified_time(self):
         try:
-            time = self.helper.meta_content("property", "article:modified_time")
+            time = self.meta_helper.meta_content("property", "article:modified_time")
             return date_parse(time)
         except Exception:
             return None
@@ -236,7 +411,7 @@ class EzSoup:
     @cached_property
     def title(self):
         readability_title = self.readablity_document.short_title()
-        return clean_title(readability_title, self.source.name)
+        return clean_title(readability_title, self.title_site_name)
 
     @cached_property
     def _not_important_routes(self):
@@ -321,8 +496,9 @@ class EzSoup:
         most_repeated_url_part_number = Counter(url_part_count_container).most_common(
             1
         )[0][0]
-        print(
-            f"I guess the urls which has {most_repeated_url_part_number} part(s) are the main ones"
+        logger.debug(
+            "I guess the urls which has %s part(s) are the main ones",
+            most_repeated_url_part_number,
         )
 
         _list = list(set(links_container))
@@ -342,21 +518,76 @@ class EzSoup:
         """
         return self._topics or self.helper.possible_topic_names
 
+    # summary field -> getter , see `summary`
+    summary_fields = {
+        "url": lambda self: self.url,
+        "source": lambda self: self.source.summary_dict if self.source else None,
+        "title": lambda self: self.title,
+        "description": lambda self: self.meta_description,
+        "date": lambda self: str(self.last_date),
+        "main_image": lambda self: self.main_image_src,
+        "main_content": lambda self: (self.main_text or "")[:100] + " ...",
+        "possible_topics": lambda self: self.topic_names,
+        "comments": lambda self: self.comments_text,
+    }
+    summary_nested = {
+        "source": lambda self, fields: (
+            self.source.summary(fields) if self.source else None
+        ),
+    }
+    # the fields that don't need the page body , "source" has its own tree
+    metadata_fields = {
+        "url",
+        "source",
+        "description",
+        "meta_description",
+        "meta_image_src",
+        "meta_article_published_time",
+        "meta_article_modified_time",
+    }
+
+    def _check_metadata_only(self, fields: List[str] = None):
+        # the body tree isn't built when only the metadata is requested
+        if fields and {f.partition(".")[0] for f in fields} <= self.metadata_fields:
+            self.metadata_only = True
+
+    def summary(self, fields: List[str] = None) -> dict:
+        """
+        Returns the summary of the page with just the `fields` , e.g. `["title", "date"]`
+        and nothing else is computed (or fetched) , `summary()` is the whole `summary_dict`.
+
+        Source fields can be selected like `"source.name"` , so the source RSS or sitemap
+        discovery doesn't happen unless they're requested.
+
+        If all the `fields` are `metadata_fields` (e.g. `["description", "meta_image_src"]`)
+        the page is parsed in `metadata_only` mode.
+        """
+        self._check_metadata_only(fields)
+        result = select_fields(self, self.summary_fields, fields, self.summary_nested)
+        if fields is None and not self.url:
+            del result["url"]
+        return result
+
     @cached_property
     def summary_dict(self):
-        obj = {
-            "source": self.source.summary_dict,
-            "title": self.title,
-            "description": self.meta_description,
-            "date": str(self.last_date),
-            "main_image": self.main_image_src,
-            "main_content": self.main_text[:100] + " ...",
-            "possible_topics": self.topic_names,
-            "comments": self.comments_text,
-        }
-        if self.url:
-            obj = {**{"url": self.url}, **obj}
-        return obj
+        return self.summary()
+
+    def freeze(self, fields: List[str] = None) -> FrozenRecord:
+        """
+        Returns a compact read-only record of the `url` and the summary `fields`
+        (all of them if `None` , see `summary`) that doesn't keep the HTML , the trees
+        or the extractors output alive , so keep the record and drop the page.
+
+        ## Example :
+        ```python
+        records = [page.freeze(["title", "date"]) for page in crawler.crawl()]
+        records[0].title
+        ```
+        """
+        values = self.summary(fields)
+        if fields is not None and "url" not in values:
+            values = {"url": self.url, **values}
+        return freeze(f"Frozen{type(self).__name__}", values)
 
     @cached_property
     def json_summary(self):
@@ -388,19 +619,113 @@ class EzSoup:
         if not links:
             return None
 
-        result = []
         if multithread:
-            # request children urls with multiple threads
-            def maper(url: str):
-                result.append(EzSoup(url=url))
+            # request children urls with multiple threads ,
+            # interleaved across hosts and polite to each one
+            children = self.iter_important_children_soups(limit=limit)
+            return [soup for soup in children if not isinstance(soup, CrawlError)]
+        # normal `for` loop and wait for each request to be completed
+        return [EzSoup(url=url, source=self._source_of(url)) for url in links]
+
+    def iter_important_children_soups(
+        self, limit: int = None, max_workers: int = None
+    ) -> Iterator[Union["EzSoup", CrawlError]]:
+        """
+        Yields the `EzSoup` of each `self.important_hrefs` link as soon as it's fetched
+        (not in the links order) or a `CrawlError(url, error)` if it failed ,
+        at most `max_workers` pages are in flight
+
+        ## Example :
+        ```python
+        for child in page.iter_important_children_soups():
+            if isinstance(child, CrawlError):
+                print(child.url, child.error)
+            else:
+                print(child.title)
+        ```
+        """
+        links = self.important_hrefs or []
+        links = links[:limit] if limit else links
 
-            with ThreadPoolExecutor() as executor:
-                executor.map(maper, links)
-        else:
-            # normal `for` loop and wait for each request to be completed
-            result = [EzSoup(url=url) for url in links]
+        def maper(url: str):
+            return EzSoup(url=url, source=self._source_of(url))
 
-        return result
+        for url, soup, error in crawl_map(maper, links, max_workers=max_workers):
+            yield CrawlError(url, error) if error else soup
+
+    def get_important_children_summaries(
+        self, limit: int = None, kind: str = "article", processes: int = None
+    ) -> List[dict]:
+        """
+        returns the `summary_dict` of the `self.important_hrefs` pages ,
+        the pages are fetched with threads but parsed and extracted
+        in a `ProcessPoolExecutor` to use all the CPU cores
+
+        `kind` : `"article"` (`EzSoup`) or `"product"` (`EzProduct`)
+        """
+        # imported here since `ezweb.extract` imports this module
+        from ezweb.extract import iter_process_summaries
+
+        links = self.important_hrefs
+        links = links[:limit] if limit else links
+        pages = [(url, None) for url in links]
+        summaries = iter_process_summaries(pages, kind=kind, processes=processes)
+        # the failed pages are left out
+        return [s for s in summaries if not isinstance(s, CrawlError)]
+
+    async def aget_important_children_soups(
+        self,
+        limit: int = None,
+        session: AsyncEzSession = None,
+        executor=None,
+    ):
+        """
+        async version of `get_important_children_soups` ,
+        the in-flight requests are bounded by the `session` concurrency
+        (the failed pages are left out , see `aiter_important_children_soups`)
+        """
+        links_to_crawl = self.important_hrefs
+        links = links_to_crawl[:limit] if limit else links_to_crawl
+        if not links:
+            return None
+        children = self.aiter_important_children_soups(
+            limit=limit, session=session, executor=executor
+        )
+        return [soup async for soup in children if not isinstance(soup, CrawlError)]
+
+    async def aiter_important_children_soups(
+        self,
+        limit: int = None,
+        session: AsyncEzSession = None,
+        executor=None,
+    ) -> AsyncIterator[Union["EzSoup", CrawlError]]:
+        """
+        async version of `iter_important_children_soups` ,
+        yields each `EzSoup` as soon as it's fetched or a `CrawlError(url, error)` if it failed
+
+        ## Example :
+        ```python
+        async for child in page.aiter_important_children_soups():
+            if isinstance(child, CrawlError):
+                print(child.url, child.error)
+        ```
+        """
+        links = self.important_hrefs or []
+        links = links[:limit] if limit else links
+
+        async def fetch(url: str):
+            return await self.afrom_url(
+                url, source=self._source_of(url), session=session, executor=executor
+            )
+
+        async for url, soup, error in async_crawl_map(fetch, links):
+            yield CrawlError(url, error) if error else soup
+
+    def _source_of(self, url: str) -> EzSource:
+        """Returns `self.source` for the same-host URLs , otherwise the registry one"""
+        if url_host(url) == url_host(self.url):
+            return self.source
+        return EzSource.of(url)
 
     def save_content_summary_txt(self, path: str = None, custom_content: str = None):
         path = path or ((self.title or "no-title") + ".txt")
@@ -1,10 +1,10 @@
-from typing import List, Optional
+from typing import AsyncIterator, Iterator, List, Optional, Union
 from urllib.parse import urlparse
 import feedparser
 from feedparser.util import FeedParserDict
-from cached_property import cached_property
+import logging
 import re
-from concurrent.futures import ThreadPoolExecutor
+import requests
 
 # https://stackoverflow.com/questions/28282797/feedparser-parse-ssl-certificate-verify-failed
 import ssl
@@ -13,28 +13,109 @@ if hasattr(ssl, "_create_unverified_context"):
     ssl._create_default_https_context = ssl._create_unverified_context
 #
 
+# reports the computing time of the properties to the metrics hooks
+from ezweb.utils.metrics import timed_cached_property as cached_property
+# the properties that fetch something , computed once by the threads sharing the source
+from ezweb.utils.metrics import timed_threaded_cached_property as threaded_cached_property
 from ezweb.utils.http import (
+    FEED_CONTENT_TYPES,
+    MAX_FEED_BYTES,
+    MAX_HEAD_BYTES,
     can_be_rss_link,
+    crawl_delay_of,
+    get_page_head,
     get_site_map_links,
     name_from_url,
     path_to_url,
     safe_get,
     safe_head,
     soup_from_url,
+    soup_of,
     url_host,
 )
 from ezweb.utils.souphelper import EzSoupHelper
+from ezweb.utils.scheduler import CrawlError, crawl_map, first_result
+from ezweb.utils.session import get_session
+from ezweb.utils.sitemap import SitemapEntry, SitemapState, walk_site_map
+from ezweb.utils.cache import TTLCache
+from ezweb.utils.fields import select_fields
+from ezweb.utils.ahttp import (
+    AsyncEzSession,
+    async_crawl_map,
+    async_safe_get,
+    run_blocking,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class EzSource:
+    # process-wide sources , one per host (see `EzSource.of`)
+    registry = TTLCache(maxsize=1024, ttl=60 * 60)
+    # hosts that no RSS feed was found for , not probed again for a while
+    no_feed_hosts = TTLCache(maxsize=4096, ttl=6 * 60 * 60)
+    # host -> its sitemap URLs (see `site_map_urls`)
+    site_maps_of_hosts = TTLCache(maxsize=4096, ttl=6 * 60 * 60)
+    # `True` reads the name , description , favicon and RSS link from just the homepage `<head>`
+    # (see `head_soup`) , the default reads them from the whole homepage
+    head_only = False
+    # the most of the homepage that is read for its `<head>`
+    max_head_bytes = MAX_HEAD_BYTES
+
     def __init__(self, url: str):
         self.url = "https://" + url_host(url)
-        self.soup = soup_from_url(self.url, log_name="EzSource initial")
-        self.helper = EzSoupHelper(self.soup, self.url)
+
+    @classmethod
+    def of(cls, url: str) -> "EzSource":
+        """
+        Returns the shared `EzSource` of the `url` host ,
+        so crawling many pages of a site doesn't create (and fetch) the source again
+        """
+        host = url_host(url)
+        return cls.registry.get_or_create(host, lambda: cls(url))
+
+    @threaded_cached_property
+    def soup(self):
+        # the homepage is fetched just when a property needs it
+        return soup_from_url(self.url, log_name="EzSource initial")
+
+    @threaded_cached_property
+    def helper(self):
+        return EzSoupHelper(self.soup, self.url)
+
+    @threaded_cached_property
+    def head_soup(self):
+        """
+        The tree of the homepage `<head>` , the fetch stops at `</head>` (or `max_head_bytes`)
+        so the name , description and favicon don't download the whole homepage.
+        It's the whole `soup` if that's already built or the page ends there anyway.
+
+        It's used in `head_only` mode , and the body isn't fetched afterwards for what the head
+        doesn't have , so the site name of the nav image and the RSS links of the body `<a>` tags
+        aren't used (the common feed paths are still probed).
+        """
+        if "soup" in self.__dict__:
+            return self.soup
+        response = get_page_head(
+            self.url, max_bytes=self.max_head_bytes, log_name="EzSource head"
+        )
+        soup = soup_of(response.text)
+        if not getattr(response, "truncated", False):
+            self.soup = soup
+        return soup
+
+    @threaded_cached_property
+    def head_helper(self):
+        if not self.head_only:
+            return self.helper
+        head_soup = self.head_soup
+        if head_soup is self.__dict__.get("soup"):
+            return self.helper
+        return EzSoupHelper(head_soup, self.url)
 
     @cached_property
     def name(self):
-        return self.helper.site_name or self.name_from_rss or self.name_from_host
+        return self.head_helper.site_name or self.name_from_rss or self.name_from_host
 
     @cached_property
     def name_from_host(self):
@@ -54,7 +135,7 @@ class EzSource:
 
     @cached_property
     def description(self):
-        m = self.helper.meta_content
+        m = self.head_helper.meta_content
         return self._from_rss_feed("description") or m("name", "description")
 
     @cached_property
@@ -63,9 +144,9 @@ class EzSource:
 
     @cached_property
     def favicon_href(self):
-        l = self.helper.absolute_href_of
+        l = self.head_helper.absolute_href_of
         #
-        icon_links = self.helper.contains("link", "rel", "icon")
+        icon_links = self.head_helper.contains("link", "rel", "icon")
         if not icon_links:
             return None
 
@@ -84,28 +165,30 @@ class EzSource:
 
         return l(biggest_icon_link_tag)
 
-    @cached_property
+    @threaded_cached_property
     def rss_feed_url_raw_data(self):
         """Returns the possible RSS URL of the source"""
-        
-        # first try to find a RSS-like href in the page
-        all_a_tags = self.helper.all(["a" , "link"])
-        guess = [
-            self.helper.absolute_href_of(a)
-            for a in all_a_tags
-            if can_be_rss_link(a)
-        ]
+        host = url_host(self.url)
+        if host in self.no_feed_hosts:
+            return None, None
+
+        # first try to find a RSS-like href in the page (its head in `head_only` mode)
+        helper = self.head_helper
+        all_a_tags = helper.all(["a" , "link"])
+        guess = [helper.absolute_href_of(a) for a in all_a_tags if can_be_rss_link(a)]
         result = self._rss_link_finder(guess)
-        
+
         # if there wasn't , check these paths
         if not result:
-            print("RSS URL not found in the page")
+            logger.debug("RSS URL not found in the page %s", self.url)
             other_guess = ["rss", "feed", "feeds"]
             other_guess = [path_to_url(p, self.url) for p in other_guess]
             result = self._rss_link_finder(other_guess)
-            
+
+        if not result:
+            self.no_feed_hosts.set(host, True)
         return result or (None , None)
-    
+
     @cached_property
     def rss_feed_url(self):
         return self.rss_feed_url_raw_data[0]
@@ -133,30 +216,57 @@ class EzSource:
         """Returns the all URLs included in RSS data"""
         return list({i.link for i in self.rss_data.get("entries", [])})
 
+    @threaded_cached_property
+    def site_map_urls(self) -> List[str]:
+        """
+        All the sitemaps of the source , the `Sitemap:` directives of the robots.txt (in their order)
+        or else the first of the common sitemap locations that exists (probed concurrently).
+        The result is shared by the `EzSource` instances of the host for a while.
+        """
+        host = url_host(self.url)
+        urls = self.site_maps_of_hosts.get(host)
+        if urls is None:
+            urls = self.site_map_urls_from_robots_txt
+            if not urls:
+                possibilities = ["sitemap.xml", "sitemap_index.xml"]
+                possibilities = [path_to_url(p, self.url) for p in possibilities]
+                # lets check which sitemap is a valid sitemap URL ,
+                # probed concurrently but the first existing one in this order wins
+                found = {
+                    url
+                    for url, ok, _ in crawl_map(self._site_map_probe, possibilities)
+                    if ok
+                }
+                urls = [url for url in possibilities if url in found][:1]
+            self.site_maps_of_hosts.set(host, urls)
+        return urls
+
     @cached_property
     def site_map_url(self):
-        # if sitemap from robots.txt is provided return it
-        if self.site_map_url_from_robots_txt:
-            return self.site_map_url_from_robots_txt
-        possibilities = ["sitemap.xml", "sitemap_index.xml"]
-        result = None
-        for n in possibilities:
-            # lets check which sitemap is a valid sitemap URL
-            url = self.url + n
-            if safe_head(url, raise_for_status=False).ok:
-                result = url
-                break
-        return result
+        return self.site_map_urls[0] if self.site_map_urls else None
+
+    @staticmethod
+    def _site_map_probe(url: str) -> Optional[bool]:
+        try:
+            return safe_head(url, raise_for_status=False).ok or None
+        except requests.RequestException:
+            return None
+
+    @cached_property
+    def site_map_urls_from_robots_txt(self) -> List[str]:
+        """The URLs of every `Sitemap:` directive of the robots.txt"""
+        urls = []
+        for url in re.findall(r"(?im)^\s*Sitemap:\s*(\S+)", self.robots_txt):
+            if not "https" in url and "://" in url:
+                url = "https://" + url.split("://")[1]
+            if url not in urls:
+                urls.append(url)
+        return urls
 
     @cached_property
     def site_map_url_from_robots_txt(self):
-        r = re.compile("Sitemap:(.+)")
-        url = r.search(self.robots_txt).group(1)
-        if not url:
-            return None
-        if not "https" in url:
-            url = "https://" + url.split("://")[1]
-        return url.strip()
+        urls = self.site_map_urls_from_robots_txt
+        return urls[0] if urls else None
 
     @cached_property
     def site_map_product_links(self):
@@ -166,24 +276,40 @@ class EzSource:
     def site_map_article_links(self):
         return self.site_map_links(contain=["article", "blog", "news"])
 
-    @cached_property
+    @threaded_cached_property
     def robots_txt(self):
         url = self.url + "/robots.txt"
-        return safe_get(url, log_name="finding sitemap , robot.txt").text
+        response = safe_get(url, raise_for_status=False, log_name="finding sitemap , robot.txt")
+        # no robots.txt means no rules
+        text = response.text if response.ok else ""
+        delay = crawl_delay_of(text)
+        scheduler = get_session().scheduler
+        if delay and scheduler:
+            scheduler.set_crawl_delay(self.url, delay)
+        return text
+
+    # summary field -> getter , see `summary`
+    summary_fields = {
+        "url": lambda self: self.url,
+        "name": lambda self: self.name,
+        "description": lambda self: self.description,
+        "language": lambda self: self.language,
+        "image": lambda self: self.favicon_href,
+        "rss_feed_url": lambda self: self.rss_feed_url,
+        "sitemap_url": lambda self: self.site_map_url,
+        # "topics": [],
+    }
+
+    def summary(self, fields: List[str] = None) -> dict:
+        """
+        Returns the summary of the source with just the `fields` (all of them if `None`) ,
+        e.g. `["url", "image"]` doesn't fetch the RSS feed or probe the sitemap
+        """
+        return select_fields(self, self.summary_fields, fields)
 
     @cached_property
     def summary_dict(self):
-        obj = {
-            "url": self.url,
-            "name": self.name,
-            "description": self.description,
-            "language": self.language,
-            "image": self.favicon_href,
-            "rss_feed_url": self.rss_feed_url,
-            "sitemap_url": self.site_map_url,
-            # "topics": [],
-        }
-        return obj
+        return self.summary()
 
     def _from_rss_feed(self, feedparser_key: str):
         if not self.rss_data:
@@ -193,6 +319,15 @@ class EzSource:
             return None
         return feed.get(feedparser_key)
 
+    def _rss_entries(self, rss_url: str = None, limit: int = None) -> list:
+        if rss_url:
+            data = feedparser.parse(safe_get(rss_url, log_name="RSS items").content)
+        else:
+            data = self.rss_data
+        # the entries without a link have no page to fetch
+        entries = [e for e in (data or {}).get("entries") or [] if e.get("link")]
+        return entries[:limit] if limit else entries
+
     def get_rss_items(
         self,
         ez_soup_class,
@@ -201,35 +336,167 @@ class EzSource:
         limit: int = None,
     ) -> list:
         """Returns the all `EzSoup` items(articles) provided in the RSS data"""
-        data = feedparser.parse(rss_url) if rss_url else self.rss_data
-        if not data:
-            return []
-        entries = data.get("entries")
-        if not entries:
-            return []
-        result = []
-        resource = entries[:limit] if limit else entries
+        if multithread:
+            items = self.iter_rss_items(ez_soup_class, rss_url=rss_url, limit=limit)
+            return [soup for soup in items if not isinstance(soup, CrawlError)]
+        return [
+            self._rss_item_soup(ez_soup_class, item)
+            for item in self._rss_entries(rss_url, limit)
+        ]
+
+    def iter_rss_items(
+        self,
+        ez_soup_class,
+        rss_url: str = None,
+        limit: int = None,
+        max_workers: int = None,
+    ) -> Iterator:
+        """
+        Yields the `EzSoup` items (articles) of the RSS data as soon as each one is fetched
+        (not in the feed order) or a `CrawlError(url, error)` if it failed ,
+        at most `max_workers` items are in flight
+        """
+        entries = self._rss_entries(rss_url, limit)
 
         def _do(item):
-            tags = [d.get("term") for d in item.get("tags", [])]
-            soup = ez_soup_class(url=item.link, topics=tags, source=self)
-            result.append(soup)
+            return self._rss_item_soup(ez_soup_class, item)
 
-        if multithread:
-            with ThreadPoolExecutor() as e:
-                e.map(_do, resource)
+        results = crawl_map(_do, entries, key=lambda i: i.link, max_workers=max_workers)
+        for item, soup, error in results:
+            yield CrawlError(item.link, error) if error else soup
+
+    def _rss_item_soup(self, ez_soup_class, item):
+        tags = [d.get("term") for d in item.get("tags", [])]
+        return ez_soup_class(url=item.link, topics=tags, source=self)
+
+    def get_rss_summaries(
+        self,
+        kind: str = "article",
+        rss_url: str = None,
+        limit: int = None,
+        processes: int = None,
+    ) -> List[dict]:
+        """
+        Returns the `summary_dict` of the RSS items ,
+        fetched with threads and parsed in a `ProcessPoolExecutor`
+        (see `ezweb.extract.iter_process_summaries`)
+        """
+        # imported here since `ezweb.extract` imports the objects
+        from ezweb.extract import iter_process_summaries
+
+        entries = self._rss_entries(rss_url, limit)
+        pages = [
+            (item.link, [d.get("term") for d in item.get("tags", [])])
+            for item in entries
+        ]
+        summaries = iter_process_summaries(pages, kind=kind, processes=processes)
+        # the failed pages are left out
+        return [s for s in summaries if not isinstance(s, CrawlError)]
+
+    async def aget_rss_items(
+        self,
+        ez_soup_class,
+        rss_url: str = None,
+        limit: int = None,
+        session: AsyncEzSession = None,
+        executor=None,
+    ) -> list:
+        """
+        async version of `get_rss_items` ,
+        the RSS entries are fetched with the async HTTP client
+        and parsed in `executor` (the failed items are left out , see `aiter_rss_items`)
+        """
+        items = self.aiter_rss_items(
+            ez_soup_class, rss_url=rss_url, limit=limit, session=session, executor=executor
+        )
+        return [soup async for soup in items if not isinstance(soup, CrawlError)]
+
+    async def aiter_rss_items(
+        self,
+        ez_soup_class,
+        rss_url: str = None,
+        limit: int = None,
+        session: AsyncEzSession = None,
+        executor=None,
+    ) -> AsyncIterator:
+        """
+        async version of `iter_rss_items` ,
+        yields each item as soon as it's fetched or a `CrawlError(url, error)` if it failed
+        """
+        if rss_url:
+            response = await async_safe_get(rss_url, session=session)
+            data = await run_blocking(executor, feedparser.parse, response.content)
         else:
-            for item in resource:
-                _do(item)
-        return result
-    
+            data = await run_blocking(executor, lambda: self.rss_data)
+        # the entries without a link have no page to fetch
+        entries = [e for e in (data or {}).get("entries") or [] if e.get("link")]
+        entries = entries[:limit] if limit else entries
+
+        async def fetch(item):
+            return await ez_soup_class.afrom_url(
+                item.link,
+                topics=[d.get("term") for d in item.get("tags", [])],
+                source=self,
+                session=session,
+                executor=executor,
+            )
+
+        async for item, soup, error in async_crawl_map(fetch, entries):
+            yield CrawlError(item.link, error) if error else soup
+
+    @staticmethod
+    def _rss_probe(url: str) -> Optional[str]:
+        # the body is read just if the `Content-Type` header is a feed one
+        try:
+            response = safe_get(
+                url,
+                raise_for_status=False,
+                max_bytes=MAX_FEED_BYTES,
+                content_types=FEED_CONTENT_TYPES,
+            )
+        except requests.RequestException:
+            return None
+        ct = response.headers.get("content-type", "")
+        ct_ok = "xml" in ct or "rss" in ct
+        if response.ok and ct_ok:
+            return response.text
+
     def _rss_link_finder(self , possibilities: List[str]):
-        for url in possibilities:
-            response = safe_get(url, raise_for_status=False)
-            ct = response.headers.get("content-type", [])
-            ct_ok = "xml" in ct or "rss" in ct
-            if response.ok and ct_ok:
-                return url , response.text
+        """Probes the `possibilities` concurrently , returns the first `(url, raw data)` found"""
+        possibilities = list(dict.fromkeys(u for u in possibilities if u))
+        url, text = first_result(self._rss_probe, possibilities, max_workers=8)
+        if url:
+            return url , text
+
+    def iter_site_map_entries(
+        self,
+        contain: Optional[list] = None,
+        sitemap_url: str = None,
+        state: Union[str, SitemapState] = None,
+    ) -> Iterator[SitemapEntry]:
+        """
+        Streams the page entries (`loc` , `lastmod`) of the source sitemaps
+        (all of the robots.txt ones) and their child sitemaps ,
+        one sitemap is downloaded and parsed at a time without collecting the URLs in memory
+
+        ## Parameters :
+        `state` :
+        a `SitemapState` (or its SQLite file path) for the incremental mode ,
+        just the new or changed (by `lastmod`) pages since the last crawl are yielded
+        and unchanged child sitemaps aren't downloaded
+        """
+        roots = [sitemap_url] if sitemap_url else self.site_map_urls
+        if isinstance(state, str):
+            state = SitemapState(state)
+        for root in roots:
+            yield from walk_site_map(root, contain=contain, state=state)
+
+    def iter_site_map_links(
+        self, contain: Optional[list] = None, state: Union[str, SitemapState] = None
+    ) -> Iterator[str]:
+        """Streams the page URLs of the source sitemap , see `iter_site_map_entries`"""
+        for entry in self.iter_site_map_entries(contain=contain, state=state):
+            yield entry.loc
 
     def site_map_links(self, contain: Optional[list]):
         if not self.site_map_url:
@@ -249,7 +516,7 @@ class EzSource:
             else:
                 not_xmls.append(link)
 
-        with ThreadPoolExecutor() as e:
-            e.map(checker, hrefs)
+        for _ in crawl_map(checker, hrefs):
+            pass
 
         return list(set(not_xmls))
\ No newline at end of file
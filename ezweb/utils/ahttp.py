@@ -0,0 +1,274 @@
+import asyncio
+import time
+import weakref
+from datetime import timedelta
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Optional,
+    Tuple,
+    Union,
+)
+import requests
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency : pip install ezweb[async]
+    aiohttp = None
+
+#
+from ezweb.utils import metrics
+from ezweb.utils.scheduler import PolitenessScheduler
+from ezweb.utils.session import (
+    DEFAULT_HEADERS,
+    ResponseTooLarge,
+    check_content_length,
+    check_content_type,
+    get_session,
+)
+
+
+class AsyncResponse:
+    """
+    A small `requests.Response` like result of the async fetches
+    (the body is already read so it can be passed to the parsers)
+    """
+
+    truncated = False
+    # until the response headers , like `requests.Response.elapsed`
+    elapsed = None
+
+    def __init__(self, url: str, status_code: int, headers, content: bytes, text: str):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.text = text
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        # the same error as the sync fetches , so one `except` handles both
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class AsyncEzSession:
+    """
+    An asyncio HTTP client with bounded concurrency ,
+    `concurrency` requests can be in flight at the same time
+    and at most `per_host` of them to the same host.
+
+    The underlying `aiohttp.ClientSession` is created lazily
+    inside the running event loop.
+
+    `scheduler` :
+    the `PolitenessScheduler` of the fetches (per-host rate , Crawl-delay , 429 / 503 backoff) ,
+    `None` shares the one of the process-wide `EzSession` so the sync and async fetches
+    of a host are limited together , `False` disables it
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 100,
+        per_host: int = 16,
+        timeout: float = 30,
+        headers: dict = None,
+        scheduler: Union[PolitenessScheduler, bool] = None,
+    ) -> None:
+        if aiohttp is None:
+            raise ImportError(
+                "The async fetch path needs `aiohttp` , install it with `pip install ezweb[async]`"
+            )
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.headers = {**DEFAULT_HEADERS, **(headers or {})}
+        self.scheduler = scheduler
+        self._client = None
+        self._semaphore = None
+
+    def _ensure_client(self):
+        if self._client is None or self._client.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.concurrency, limit_per_host=self.per_host
+            )
+            self._client = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._client
+
+    async def request(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        """The body limits are the same as `EzSession.get` but `stop_at` (see `read_limited`)"""
+        if not metrics.hooks:
+            return await self._polite_request(method, url, **kwargs)
+        start = time.perf_counter()
+        try:
+            response = await self._polite_request(method, url, **kwargs)
+        except Exception as e:
+            metrics.emit(metrics.fetch_event(method, url, start, error=e))
+            raise
+        metrics.emit(metrics.fetch_event(method, url, start, response))
+        return response
+
+    def _scheduler(self) -> Optional[PolitenessScheduler]:
+        if self.scheduler is None:
+            return get_session().scheduler
+        return self.scheduler or None
+
+    async def _polite_request(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        scheduler = self._scheduler()
+        if scheduler is None:
+            return await self._request(method, url, **kwargs)
+        async with scheduler.async_slot(url):
+            response = await self._request(method, url, **kwargs)
+        scheduler.feedback(url, response)
+        return response
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        max_bytes: int = None,
+        content_types: Iterable[str] = None,
+        truncate: bool = False,
+        **kwargs,
+    ) -> AsyncResponse:
+        client = self._ensure_client()
+        async with self._semaphore:
+            start = time.perf_counter()
+            async with client.request(method, url, **kwargs) as response:
+                result = AsyncResponse(
+                    str(response.url), response.status, response.headers, b"", ""
+                )
+                result.elapsed = timedelta(seconds=time.perf_counter() - start)
+                check_content_type(result, content_types)
+                if max_bytes is None:
+                    result.content = await response.read()
+                    if result.content:
+                        result.text = await response.text(errors="replace")
+                    return result
+                check_content_length(result, max_bytes, truncate)
+                content = b""
+                # one more byte to know if the body is longer
+                while len(content) <= max_bytes:
+                    chunk = await response.content.read(max_bytes + 1 - len(content))
+                    if not chunk:
+                        break
+                    content += chunk
+                if len(content) > max_bytes:
+                    if not truncate:
+                        raise ResponseTooLarge(
+                            f"the body is more than {max_bytes} bytes : {result.url}"
+                        )
+                    content = content[:max_bytes]
+                    result.truncated = True
+                result.content = content
+                result.text = content.decode(response.charset or "utf-8", errors="replace")
+                return result
+
+    async def get(self, url: str, **kwargs) -> AsyncResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def head(self, url: str, **kwargs) -> AsyncResponse:
+        kwargs.setdefault("allow_redirects", False)
+        return await self.request("HEAD", url, **kwargs)
+
+    async def close(self):
+        if self._client is not None and not self._client.closed:
+            await self._client.close()
+        self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+# one default session per event loop since aiohttp sessions are bound to their loop
+_sessions = weakref.WeakKeyDictionary()
+
+
+def get_async_session() -> AsyncEzSession:
+    """Returns the default `AsyncEzSession` of the running event loop"""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None:
+        session = AsyncEzSession()
+        _sessions[loop] = session
+    return session
+
+
+async def close_async_session():
+    """
+    Closes the default `AsyncEzSession` of the running event loop (see `get_async_session`) ,
+    await it before the loop ends so its connections aren't left open
+    """
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+async def async_safe_get(
+    url: str,
+    raise_for_status: bool = True,
+    session: Optional[AsyncEzSession] = None,
+    **kwargs,
+) -> AsyncResponse:
+    session = session or get_async_session()
+    response = await session.get(url, **kwargs)
+    if raise_for_status:
+        response.raise_for_status()
+    return response
+
+
+async def async_safe_head(
+    url: str,
+    raise_for_status: bool = True,
+    session: Optional[AsyncEzSession] = None,
+    **kwargs,
+) -> AsyncResponse:
+    session = session or get_async_session()
+    response = await session.head(url, **kwargs)
+    if raise_for_status:
+        response.raise_for_status()
+    return response
+
+
+async def run_blocking(executor, func, *args):
+    """Runs `func(*args)` (parsing , blocking properties...) in `executor` without blocking the loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+
+async def async_crawl_map(
+    fn: Callable[[Any], Awaitable[Any]], items: Iterable[Any]
+) -> AsyncIterator[Tuple[Any, Any, Optional[BaseException]]]:
+    """
+    Awaits `fn(item)` for all the `items` concurrently and yields `(item, result, exception)`
+    as they complete (the async `crawl_map` , the requests are bounded by the session) ,
+    the unfinished calls are cancelled if the iteration stops early
+    """
+
+    async def run(item):
+        try:
+            return item, await fn(item), None
+        except Exception as e:
+            return item, None, e
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,62 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    A fixed-size seen-set for a huge number of strings (URLs) ,
+    `capacity` items take about `-capacity * ln(error_rate) / ln(2)^2` bits
+    (10M URLs with 1% false positives is ~12 MB).
+    A false positive means a new URL might be treated as already seen , never the reverse.
+    """
+
+    def __init__(self, capacity: int = 10_000_000, error_rate: float = 0.01) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> bool:
+        """Adds the `item` , returns `False` if it was (probably) already in the set"""
+        added = False
+        for p in self._positions(item):
+            byte, bit = divmod(p, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item: str) -> bool:
+        for p in self._positions(item):
+            byte, bit = divmod(p, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getstate__(self):
+        return {
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "size": self.size,
+            "hash_count": self.hash_count,
+            "bits": bytes(self.bits),
+            "count": self.count,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.bits = bytearray(state["bits"])
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """
+    A thread-safe in-memory cache with size-bounded (LRU) eviction
+    and an optional time-to-live for each item
+
+    ## Parameters :
+    `maxsize` :
+    the least recently used items are evicted when the cache is full
+
+    `ttl` :
+    seconds that an item is valid , `None` means forever
+    """
+
+    _missing = object()
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and (time.monotonic() - created) > self.ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, self._missing)
+            if item is self._missing:
+                return default
+            created, value = item
+            if self._expired(created):
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Returns the cached value of `key` or caches and returns `factory()`"""
+        with self._lock:
+            value = self.get(key, self._missing)
+            if value is self._missing:
+                value = factory()
+                self.set(key, value)
+            return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, self._missing) is not self._missing
+
+    def __len__(self) -> int:
+        return len(self._data)
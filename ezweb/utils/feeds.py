@@ -0,0 +1,81 @@
+import json
+from typing import Optional, Union
+import feedparser
+from feedparser.util import FeedParserDict
+
+#
+from ezweb.utils.http import MAX_FEED_BYTES, safe_get
+from ezweb.utils.store import KeyValueStore
+
+
+class FeedState:
+    """
+    Remembers the `ETag` / `Last-Modified` of the feeds and the seen entries
+    in a store (in memory by default) to poll feeds incrementally
+    """
+
+    def __init__(self, store: Union[str, KeyValueStore] = ":memory:") -> None:
+        if isinstance(store, str):
+            store = KeyValueStore(store, table="feed_state")
+        self.store = store
+
+    def validators(self, feed_url: str) -> dict:
+        """The conditional request headers of the feed"""
+        value = self.store.get(f"feed:{feed_url}")
+        if not value:
+            return {}
+        etag, last_modified = json.loads(value)
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def set_validators(self, feed_url: str, headers):
+        value = [headers.get("ETag"), headers.get("Last-Modified")]
+        self.store.set(f"feed:{feed_url}", json.dumps(value))
+
+    @staticmethod
+    def entry_key(entry: FeedParserDict) -> Optional[str]:
+        """The GUID of the entry or its link"""
+        return entry.get("id") or entry.get("link")
+
+    def is_new(self, entry: FeedParserDict) -> bool:
+        key = self.entry_key(entry)
+        return bool(key) and f"entry:{key}" not in self.store
+
+    def mark(self, entry: FeedParserDict):
+        key = self.entry_key(entry)
+        if key:
+            self.store.set(f"entry:{key}", entry.get("link"))
+
+    def flush(self):
+        self.store.flush()
+
+
+def fetch_feed(
+    feed_url: str, state: FeedState = None, save_validators: bool = True
+) -> Optional[FeedParserDict]:
+    """
+    Downloads and parses the feed with a conditional request (if the `state` has its validators) ,
+    returns `None` if the feed isn't modified since the last fetch.
+
+    The response headers are in `data.headers` , `save_validators=False` doesn't save them
+    in the `state` so the caller can do it when the new entries are handled
+    (`state.set_validators(feed_url, data.headers)`)
+    """
+    headers = state.validators(feed_url) if state else {}
+    response = safe_get(
+        feed_url, headers=headers, max_bytes=MAX_FEED_BYTES, log_name="polling feed"
+    )
+    # `not_modified` is set by the session response cache , it has the whole cached body
+    # so it's parsed if the state has no validators (its entries weren't all handled)
+    not_modified = response.status_code == 304 or getattr(response, "not_modified", False)
+    if headers and not_modified:
+        return None
+    data = feedparser.parse(response.content)
+    data["headers"] = dict(response.headers)
+    if state and save_validators:
+        state.set_validators(feed_url, response.headers)
+    return data
@@ -0,0 +1,108 @@
+from typing import Callable, Dict, List
+from bs4.element import Tag
+
+
+def select_fields(
+    obj,
+    summary_fields: Dict[str, Callable],
+    fields: List[str] = None,
+    nested: Dict[str, Callable] = None,
+) -> dict:
+    """
+    Returns the summary of `obj` with just the `fields` (all the `summary_fields` if `None`) ,
+    only the properties of the requested fields (and what they depend on) are computed
+    since every property is lazy.
+
+    - `summary_fields` maps a field name to `getter(obj)`
+    - `"parent.child"` fields are selected from a nested summary ,
+    `nested` maps the parent name to `getter(obj, child_fields)`
+    - a public property name of `obj` (e.g. `meta_description`) is accepted as a field too
+    """
+    if fields is None:
+        return {name: get(obj) for name, get in summary_fields.items()}
+    nested = nested or {}
+    result = {}
+    children = {}
+    for field in fields:
+        parent, _, child = field.partition(".")
+        if child:
+            if parent not in nested:
+                raise ValueError(f"{parent} has no nested fields")
+            children.setdefault(parent, []).append(child)
+            # keeps the requested order
+            result.setdefault(parent, None)
+        elif field in summary_fields:
+            result[field] = summary_fields[field](obj)
+        elif not field.startswith("_") and hasattr(type(obj), field):
+            result[field] = getattr(obj, field)
+        else:
+            raise ValueError(
+                f"Unknown field {field} , available fields : {list(summary_fields)}"
+            )
+    for parent, child_fields in children.items():
+        result[parent] = nested[parent](obj, child_fields)
+    return result
+
+
+class FrozenRecord:
+    """
+    A compact immutable record of some computed fields (see `EzSoup.freeze`) ,
+    each fields set gets its own `__slots__` class so a record has no `__dict__`
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **values) -> None:
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is frozen")
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self.as_dict() == other.as_dict()
+
+    def __repr__(self) -> str:
+        values = " , ".join(f"{k}={v!r}" for k, v in self.as_dict().items())
+        return f"{type(self).__name__}({values})"
+
+    def __reduce__(self):
+        # the classes are made on the fly , so they're pickled by their name and fields
+        return _record_of, (type(self).__name__, self.as_dict())
+
+
+_record_classes = {}
+
+
+def _record_of(name: str, values: dict) -> FrozenRecord:
+    key = (name, tuple(values))
+    cls = _record_classes.get(key)
+    if cls is None:
+        cls = type(name, (FrozenRecord,), {"__slots__": tuple(values)})
+        cls = _record_classes.setdefault(key, cls)
+    return cls(**values)
+
+
+def detached(value):
+    """
+    A copy of `value` without references to the parsed tree ,
+    the bs4 strings become plain `str` and the tags their HTML
+    """
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, Tag):
+        return str(value)
+    if isinstance(value, dict):
+        return {k: detached(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return type(value)(detached(v) for v in value)
+    return value
+
+
+def freeze(name: str, values: dict) -> FrozenRecord:
+    """Returns a `FrozenRecord` of the `values` (detached from the parsed tree)"""
+    values = {k: detached(v) for k, v in values.items()}
+    return _record_of(name, values)
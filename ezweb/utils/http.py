@@ -1,51 +1,116 @@
 import requests
+from copy import deepcopy
 from pathlib import PurePosixPath
 from typing import Union
 from bs4 import BeautifulSoup, FeatureNotFound
-from urllib.parse import unquote, urlparse
+from lxml.html import HtmlElement, HTMLParser, document_fromstring, tostring
+from urllib.parse import parse_qsl, unquote, urlencode, urlparse, urlunparse
+import logging
 import os
 
+#
+from ezweb.utils import metrics
+from ezweb.utils.session import get_session
+from ezweb.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+# the limits of the page fetches , so a link to a huge file or an endless stream
+# (reached from the hrefs of a page or a sitemap) isn't downloaded
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+MAX_PAGE_BYTES = 10 * 1024 * 1024
+FEED_CONTENT_TYPES = (
+    "application/rss",
+    "application/x-rss",
+    "application/atom",
+    "application/rdf",
+    "application/xml",
+    "text/xml",
+)
+MAX_FEED_BYTES = 20 * 1024 * 1024
+# the most of a page that is read for its `<head>` , see `get_page_head`
+MAX_HEAD_BYTES = 512 * 1024
+
 
 def cls():
     os.system("cls" if os.name == "nt" else "clear")
 
 
 def safe_get(
-    url: str, raise_for_status: bool = True, log_name: str = ""
+    url: str, raise_for_status: bool = True, log_name: str = "", **kwargs
 ) -> requests.Response:
     # print(log_name, f"Requesting {url}\n", end="")
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36"
-    }
-    response = requests.get(url, headers=headers)
+    response = get_session().get(url, **kwargs)
     if raise_for_status:
         response.raise_for_status()
-    t = round(response.elapsed.total_seconds(), 3)
-    print(f"Request finished : {t} seconds", url)
     return response
 
 
 def safe_head(
-    url: str, raise_for_status: bool = True, log_name: str = ""
+    url: str, raise_for_status: bool = True, log_name: str = "", **kwargs
 ) -> requests.Response:
     # print(log_name, f"Heading {url}\n", end="")
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36"
-    }
-    response = requests.head(url, headers=headers)
+    response = get_session().head(url, **kwargs)
     if raise_for_status:
         response.raise_for_status()
-    t = round(response.elapsed.total_seconds(), 3)
-    print(f"Head Request finished : {t} seconds", url)
     return response
 
 
-def soup_from_url(url: str, **kwargs) -> BeautifulSoup:
+def get_page(url: str, **kwargs) -> requests.Response:
+    """`safe_get` of an HTML page , with `MAX_PAGE_BYTES` and `HTML_CONTENT_TYPES` limits"""
+    kwargs.setdefault("max_bytes", MAX_PAGE_BYTES)
+    kwargs.setdefault("content_types", HTML_CONTENT_TYPES)
+    return safe_get(url, **kwargs)
+
+
+def get_page_head(url: str, max_bytes: int = MAX_HEAD_BYTES, **kwargs) -> requests.Response:
+    """
+    `get_page` that stops reading the body at `</head>` (or after `max_bytes`) ,
+    `response.truncated` is `False` if the whole page was read anyway
+    """
+    kwargs.update(max_bytes=max_bytes, truncate=True, stop_at=b"</head>")
+    return get_page(url, **kwargs)
+
+
+def soup_from_url(url: str, shared: bool = False, **kwargs) -> BeautifulSoup:
     response = safe_get(url, **kwargs)
-    return soup_of(response.text)
+    return soup_of_response(response, shared=shared)
+
+
+# parsed trees of the responses that can be served from the `ResponseCache` ,
+# so a page that is fresh or not modified (304) isn't parsed again (see `soup_of_response`)
+_parsed_responses = TTLCache(maxsize=64)
+
+
+def _validator_of(response: requests.Response):
+    h = response.headers
+    validator = h.get("ETag") or h.get("Last-Modified")
+    if not validator:
+        return None
+    return (response.url, validator, len(response.content))
+
+
+def soup_of_response(response: requests.Response, shared: bool = False) -> BeautifulSoup:
+    """
+    Parses the response , `shared=True` returns the same tree for the same cached (or `304`)
+    response , so the tree must be read-only : nothing should decompose or extract its nodes
+    and it may be read by many threads
+    """
+    # the `from_cache` attribute is set just when the session has a cache
+    if not shared or not hasattr(response, "from_cache"):
+        return soup_of(response.text)
+    key = _validator_of(response)
+    soup = _parsed_responses.get(key) if key else None
+    if soup is None:
+        soup = soup_of(response.text)
+        if key:
+            _parsed_responses.set(key, soup)
+    return soup
 
 
 def soup_of(content: Union[str, bytes]):
+    metrics.note_parse("beautifulsoup")
     try:
         soup = BeautifulSoup(content, features="lxml")
         return soup
@@ -54,6 +119,51 @@ def soup_of(content: Union[str, bytes]):
         return soup
 
 
+def lxml_tree_of(content: Union[str, bytes]) -> HtmlElement:
+    metrics.note_parse("lxml")
+    if isinstance(content, str):
+        # lxml doesn't accept unicode strings with an encoding declaration
+        content = content.encode("utf-8")
+    parser = HTMLParser(encoding="utf-8")
+    return document_fromstring(content, parser=parser)
+
+
+# the body nodes that are kept (with the whole `<head>`) by `head_soup_of`
+METADATA_BODY_XPATH = (
+    "//body//nav[not(ancestor::nav)]"
+    " | //body//meta[not(ancestor::nav)]"
+    ' | //body//script[@type="application/ld+json"][not(ancestor::nav)]'
+)
+
+
+def head_soup_of(content: Union[str, bytes, HtmlElement]) -> BeautifulSoup:
+    """
+    A BeautifulSoup tree of just the metadata of the page : the `<head>` ,
+    the `<nav>` and `<meta>` tags and the JSON-LD scripts of the body.
+
+    The page is parsed by `lxml` (fast) and only those nodes are built as a soup ,
+    so the metadata (meta tags , structured data , site name) of a heavy page
+    is read without building its whole body tree.
+    An already parsed tree (`lxml_tree_of`) isn't parsed again , its nodes are copied.
+    """
+    if isinstance(content, HtmlElement):
+        tree, take = content, deepcopy
+    else:
+        # appending moves the nodes out of this tree , nothing else uses it
+        tree, take = lxml_tree_of(content), lambda node: node
+    root = tree.makeelement("html", dict(tree.attrib))
+    head = tree.find("head")
+    if head is not None:
+        root.append(take(head))
+    body = tree.makeelement("body", {})
+    for node in tree.xpath(METADATA_BODY_XPATH):
+        node = take(node)
+        node.tail = None
+        body.append(node)
+    root.append(body)
+    return soup_of(tostring(root, encoding="unicode"))
+
+
 def is_url_root(url: str) -> bool:
     result = True
     if "http" in url:
@@ -92,6 +202,30 @@ def pure_url(url: str):
     return pure.parts
 
 
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def normalize_url(url: str) -> str:
+    """
+    Returns a canonical form of the `url` to dedupe the crawled URLs ,
+    lower-case scheme and host , no default port , fragment or tracking params
+    and sorted query params
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    port = parsed.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    query = [
+        (k, v)
+        for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    ]
+    path = parsed.path or "/"
+    return urlunparse((scheme, host, path, parsed.params, urlencode(sorted(query)), ""))
+
+
 def url_host(url: str):
     return urlparse(url).hostname
 
@@ -110,6 +244,32 @@ def path_to_url(path: str , url : str):
     url += path
     return url
 
+def crawl_delay_of(robots_txt: str, user_agent: str = "*"):
+    """Returns the `Crawl-delay` (seconds) of the `user_agent` group in a robots.txt"""
+    agents = []
+    delay = None
+    in_rules = False
+    for line in robots_txt.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        field, value = [x.strip() for x in line.split(":", 1)]
+        field = field.lower()
+        if field == "user-agent":
+            if in_rules:
+                agents = []
+                in_rules = False
+            agents.append(value.lower())
+            continue
+        in_rules = True
+        if field == "crawl-delay" and user_agent.lower() in agents:
+            try:
+                delay = float(value)
+            except ValueError:
+                pass
+    return delay
+
+
 def can_be_rss_link(a) -> bool:
     href = a.get("href" , "").lower()
     text = (a.text or "").lower()
@@ -127,6 +287,18 @@ def can_be_rss_link(a) -> bool:
         return True
     return False
 
+def url_path_contains(url: str, contain: list) -> bool:
+    """Whether the first or second path part of the `url` contains one of the `contain` words"""
+    parts = pure_url(url)
+    for w in contain:
+        w = w.lower()
+        if len(parts) >= 2 and w in parts[1].lower():
+            return True
+        if len(parts) >= 3 and w in parts[2].lower():
+            return True
+    return False
+
+
 def get_site_map_links(sitemap_url: str, contain: list = None):
     soup = soup_from_url(sitemap_url)
     hrefs = list({a["href"] for a in soup.find_all("a", href=True)})
@@ -141,21 +313,11 @@ def get_site_map_links(sitemap_url: str, contain: list = None):
     hrefs_are_direct_to_content = len(first_paths) > 45
     if not hrefs_are_direct_to_content:
         if contain:
-
-            def contain_cond(url: str):
-                for w in contain:
-                    w = w.lower()
-                    parts = pure_url(url)
-                    if len(parts) >= 2 and w in parts[1].lower():
-                        return True
-                    if len(parts) >= 3 and w in parts[2].lower():
-                        return True
-                return False
-
-            hrefs = [l for l in hrefs if contain_cond(l)]
+            hrefs = [l for l in hrefs if url_path_contains(l, contain)]
     elif contain:
-        print(f"We had {len(first_paths)} different first path of the URLs")
-        print(
-            "Seems the first sitemap links are direct to the webpages. So I didn't apply contain checks"
+        logger.debug(
+            "%s different first paths of the sitemap URLs , seems they are direct to the webpages"
+            " so the contain checks aren't applied",
+            len(first_paths),
         )
     return hrefs, hrefs_are_direct_to_content
@@ -0,0 +1,225 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+def _max_age(headers) -> Optional[float]:
+    """Returns the freshness lifetime (seconds) of a response from its headers"""
+    cache_control = headers.get("Cache-Control", "").lower()
+    directives = [d.strip() for d in cache_control.split(",") if d.strip()]
+    if "no-cache" in directives:
+        return 0
+    for d in directives:
+        if d.startswith("max-age="):
+            try:
+                return max(float(d.split("=", 1)[1]), 0)
+            except ValueError:
+                return 0
+    expires = headers.get("Expires")
+    if expires:
+        try:
+            return max(parsedate_to_datetime(expires).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return 0
+    return None
+
+
+def _is_storable(response: requests.Response) -> bool:
+    if response.status_code != 200:
+        return False
+    cache_control = response.headers.get("Cache-Control", "").lower()
+    return "no-store" not in cache_control
+
+
+class CachedEntry:
+    def __init__(
+        self,
+        url: str,
+        final_url: str,
+        status: int,
+        headers: dict,
+        content: bytes,
+        stored: float,
+        max_age: Optional[float],
+    ) -> None:
+        self.url = url
+        self.final_url = final_url
+        self.status = status
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.stored = stored
+        self.max_age = max_age
+
+    @property
+    def is_fresh(self) -> bool:
+        if not self.max_age:
+            return False
+        return (time.time() - self.stored) < self.max_age
+
+    @property
+    def validators(self) -> dict:
+        """Conditional request headers of this entry"""
+        headers = {}
+        if self.headers.get("ETag"):
+            headers["If-None-Match"] = self.headers["ETag"]
+        if self.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = self.headers["Last-Modified"]
+        return headers
+
+    def to_response(self, not_modified: bool = False) -> requests.Response:
+        response = requests.Response()
+        response.url = self.final_url
+        response.status_code = self.status
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.content
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        response.not_modified = not_modified
+        return response
+
+
+class ResponseCache:
+    """
+    A persistent (SQLite) cache of the GET responses.
+
+    - fresh responses (`Cache-Control: max-age` , `Expires`) are served without a request
+    - stale ones are revalidated with `If-None-Match` / `If-Modified-Since` ,
+    a `304` response is served from the cache with `response.not_modified = True`
+    - the least recently used responses are evicted when the total size exceeds `max_bytes`
+
+    ## Example :
+    ```python
+    configure_session(cache=ResponseCache("~/.ezweb/cache.sqlite"))
+    ```
+    """
+
+    def __init__(self, path: str = "ezweb-cache.sqlite", max_bytes: int = 512 * 1024 ** 2):
+        path = os.path.expanduser(path)
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    final_url TEXT,
+                    status INTEGER,
+                    headers TEXT,
+                    content BLOB,
+                    stored REAL,
+                    max_age REAL,
+                    size INTEGER,
+                    accessed REAL
+                )
+                """
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+
+    def get(self, url: str) -> Optional[CachedEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, final_url, status, headers, content, stored, max_age"
+                " FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if not row:
+                return None
+            with self._db:
+                self._db.execute(
+                    "UPDATE responses SET accessed = ? WHERE url = ?", (time.time(), url)
+                )
+        url, final_url, status, headers, content, stored, max_age = row
+        return CachedEntry(
+            url, final_url, status, json.loads(headers), content, stored, max_age
+        )
+
+    def store(self, url: str, response: requests.Response):
+        if not _is_storable(response):
+            return
+        content = response.content
+        headers = json.dumps(dict(response.headers))
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    response.url,
+                    response.status_code,
+                    headers,
+                    content,
+                    now,
+                    _max_age(response.headers),
+                    len(content),
+                    now,
+                ),
+            )
+            self._evict()
+
+    def revalidated(self, entry: CachedEntry, not_modified_headers) -> CachedEntry:
+        """Updates `entry` with the headers of a `304` response to it"""
+        for key in ("ETag", "Last-Modified", "Cache-Control", "Expires", "Date"):
+            if key in not_modified_headers:
+                entry.headers[key] = not_modified_headers[key]
+        entry.stored = time.time()
+        entry.max_age = _max_age(entry.headers)
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE responses SET headers = ?, stored = ?, max_age = ?, accessed = ?"
+                " WHERE url = ?",
+                (
+                    json.dumps(dict(entry.headers)),
+                    entry.stored,
+                    entry.max_age,
+                    entry.stored,
+                    entry.url,
+                ),
+            )
+        return entry
+
+    def delete(self, url: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses")
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+
+    def _evict(self):
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute(
+            "SELECT url, size FROM responses ORDER BY accessed ASC"
+        ).fetchall()
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,335 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, namedtuple
+from typing import Callable, List, Optional
+from urllib.parse import urlparse
+from cached_property import cached_property
+
+logger = logging.getLogger(__name__)
+
+FetchEvent = namedtuple(
+    "FetchEvent",
+    ["method", "url", "host", "status", "bytes", "dns", "connect", "ttfb", "total", "cache", "error"],
+)
+FetchEvent.__doc__ = """
+An HTTP request of the session , the times are in seconds :
+`dns` and `connect` (TCP + TLS) are `0` when a kept-alive connection is reused ,
+`ttfb` is until the response headers and `total` includes reading the body.
+`cache` is `None` without a `ResponseCache` , else `"hit"` , `"revalidated"` (304) or `"miss"`
+"""
+
+ExtractEvent = namedtuple("ExtractEvent", ["cls", "property", "duration", "parses"])
+ExtractEvent.__doc__ = """
+The first (computing) access of a cached property , `duration` (seconds) includes
+the properties it depends on and `parses` is how many documents were parsed meanwhile
+"""
+
+ParseEvent = namedtuple("ParseEvent", ["kind"])
+ParseEvent.__doc__ = """
+A document parse , `kind` is `"beautifulsoup"` , `"lxml"` , `"readability"` or `"trafilatura"`
+"""
+
+# the registered hooks , nothing is measured while it's empty
+hooks: List[Callable] = []
+_local = threading.local()
+
+
+def add_hook(hook: Callable) -> Callable:
+    """
+    Registers `hook(event)` for all the `FetchEvent`s , `ExtractEvent`s and `ParseEvent`s ,
+    it's called in the thread of the request or the extraction so it should be quick
+
+    ## Example :
+    ```python
+    @add_hook
+    def slow_requests(event):
+        if isinstance(event, FetchEvent) and event.total > 5:
+            print(event.url)
+    ```
+    """
+    hooks.append(hook)
+    return hook
+
+
+def remove_hook(hook: Callable):
+    if hook in hooks:
+        hooks.remove(hook)
+
+
+def emit(event):
+    for hook in list(hooks):
+        try:
+            hook(event)
+        except Exception:
+            # a broken hook shouldn't break the fetch or the extraction
+            logger.exception("metrics hook %r failed", hook)
+
+
+def note_parse(kind: str):
+    """Called by the parsers , counts the parsed documents of the thread and emits a `ParseEvent`"""
+    if hooks:
+        _local.parses = getattr(_local, "parses", 0) + 1
+        emit(ParseEvent(kind))
+
+
+def note_connection(dns: float = 0.0, connect: float = 0.0):
+    """Called by the connections , adds the DNS and connect times of the current request"""
+    _local.dns = getattr(_local, "dns", 0.0) + dns
+    _local.connect = getattr(_local, "connect", 0.0) + connect
+
+
+def connection_times():
+    return getattr(_local, "dns", 0.0), getattr(_local, "connect", 0.0)
+
+
+def fetch_started() -> float:
+    _local.dns = 0.0
+    _local.connect = 0.0
+    return time.perf_counter()
+
+
+def _body_size(response) -> Optional[int]:
+    content = getattr(response, "_content", None)
+    if isinstance(content, bytes):
+        return len(content)
+    # a streamed body that isn't read yet
+    length = response.headers.get("Content-Length", "")
+    return int(length) if length.isdigit() else None
+
+
+def _cache_result(response) -> Optional[str]:
+    if not hasattr(response, "from_cache"):
+        return None
+    if response.not_modified:
+        return "revalidated"
+    return "hit" if response.from_cache else "miss"
+
+
+def fetch_event(
+    method: str,
+    url: str,
+    start: float,
+    response=None,
+    error=None,
+    dns: float = None,
+    connect: float = None,
+) -> FetchEvent:
+    has_response = response is not None
+    elapsed = getattr(response, "elapsed", None)
+    return FetchEvent(
+        method=method,
+        url=url,
+        host=urlparse(url).hostname,
+        status=response.status_code if has_response else None,
+        bytes=_body_size(response) if has_response else None,
+        dns=dns,
+        connect=connect,
+        ttfb=elapsed.total_seconds() if elapsed is not None else None,
+        total=time.perf_counter() - start,
+        cache=_cache_result(response) if has_response else None,
+        error=repr(error) if error is not None else None,
+    )
+
+
+def fetch_finished(method: str, url: str, start: float, response=None, error=None):
+    """Emits the `FetchEvent` of a request of the session , started by `fetch_started`"""
+    dns, connect = connection_times()
+    emit(fetch_event(method, url, start, response, error, dns, connect))
+
+
+class timed_cached_property(cached_property):
+    """
+    A `cached_property` that emits an `ExtractEvent` when it's computed (and there's a hook) ,
+    the later accesses are plain attribute reads as before
+    """
+
+    def __get__(self, obj, cls):
+        if obj is None or not hooks:
+            return super().__get__(obj, cls)
+        parses = getattr(_local, "parses", 0)
+        start = time.perf_counter()
+        value = super().__get__(obj, cls)
+        emit(
+            ExtractEvent(
+                cls=type(obj).__name__,
+                property=self.func.__name__,
+                duration=time.perf_counter() - start,
+                parses=getattr(_local, "parses", 0) - parses,
+            )
+        )
+        return value
+
+
+class timed_threaded_cached_property(timed_cached_property):
+    """
+    A `timed_cached_property` that is computed once even if many threads access it together ,
+    the lock is of the instance (not of the class like `threaded_cached_property`)
+    so different instances are still computed concurrently
+    """
+
+    _locks_lock = threading.Lock()
+
+    def _lock_of(self, obj) -> threading.RLock:
+        with self._locks_lock:
+            locks = obj.__dict__.setdefault("_property_locks", {})
+            return locks.setdefault(self.func.__name__, threading.RLock())
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        name = self.func.__name__
+        if name in obj.__dict__:
+            return obj.__dict__[name]
+        with self._lock_of(obj):
+            # computed by another thread meanwhile
+            if name in obj.__dict__:
+                return obj.__dict__[name]
+            return super().__get__(obj, cls)
+
+
+def _labels(**labels) -> str:
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class MetricsCollector:
+    """
+    A hook that aggregates the events , exported as Prometheus text or JSON
+
+    ## Example :
+    ```python
+    metrics = enable_metrics()
+    # ... crawl ...
+    print(metrics.to_prometheus())
+    ```
+    """
+
+    PHASES = ("dns", "connect", "ttfb", "total")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            # (host , status) -> count , status is "error" for the failed requests
+            self.fetches = defaultdict(int)
+            self.bytes = defaultdict(int)
+            # (host , phase) -> [sum , count]
+            self.fetch_seconds = defaultdict(lambda: [0.0, 0])
+            self.cache = defaultdict(int)
+            # (class , property) -> [sum , count , parses]
+            self.extractions = defaultdict(lambda: [0.0, 0, 0])
+
+    def __call__(self, event):
+        if isinstance(event, FetchEvent):
+            self._on_fetch(event)
+        elif isinstance(event, ExtractEvent):
+            self._on_extract(event)
+
+    def _on_fetch(self, e: FetchEvent):
+        with self._lock:
+            self.fetches[(e.host, e.status or "error")] += 1
+            if e.bytes:
+                self.bytes[e.host] += e.bytes
+            for phase in self.PHASES:
+                seconds = getattr(e, phase)
+                # dns and connect are measured just for the new connections
+                if seconds is None or (phase in ("dns", "connect") and not seconds):
+                    continue
+                item = self.fetch_seconds[(e.host, phase)]
+                item[0] += seconds
+                item[1] += 1
+            if e.cache:
+                self.cache[e.cache] += 1
+
+    def _on_extract(self, e: ExtractEvent):
+        with self._lock:
+            item = self.extractions[(e.cls, e.property)]
+            item[0] += e.duration
+            item[1] += 1
+            item[2] += e.parses
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "fetches": [
+                    {"host": host, "status": status, "count": count}
+                    for (host, status), count in self.fetches.items()
+                ],
+                "bytes": dict(self.bytes),
+                "fetch_seconds": [
+                    {"host": host, "phase": phase, "sum": round(s, 6), "count": n}
+                    for (host, phase), (s, n) in self.fetch_seconds.items()
+                ],
+                "cache": dict(self.cache),
+                "extractions": [
+                    {"class": c, "property": p, "sum": round(s, 6), "count": n, "parses": parses}
+                    for (c, p), (s, n, parses) in self.extractions.items()
+                ],
+            }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format"""
+        d = self.as_dict()
+        lines = [
+            "# HELP ezweb_fetch_total HTTP requests by host and status",
+            "# TYPE ezweb_fetch_total counter",
+        ]
+        for f in d["fetches"]:
+            lines.append(f"ezweb_fetch_total{_labels(host=f['host'], status=f['status'])} {f['count']}")
+        lines += [
+            "# HELP ezweb_fetch_bytes_total response body bytes by host",
+            "# TYPE ezweb_fetch_bytes_total counter",
+        ]
+        for host, size in d["bytes"].items():
+            lines.append(f"ezweb_fetch_bytes_total{_labels(host=host)} {size}")
+        lines += [
+            "# HELP ezweb_fetch_seconds request time by host and phase (dns , connect , ttfb , total)",
+            "# TYPE ezweb_fetch_seconds summary",
+        ]
+        for t in d["fetch_seconds"]:
+            labels = _labels(host=t["host"], phase=t["phase"])
+            lines.append(f"ezweb_fetch_seconds_sum{labels} {t['sum']}")
+            lines.append(f"ezweb_fetch_seconds_count{labels} {t['count']}")
+        lines += [
+            "# HELP ezweb_fetch_cache_total response cache results",
+            "# TYPE ezweb_fetch_cache_total counter",
+        ]
+        for result, count in d["cache"].items():
+            lines.append(f"ezweb_fetch_cache_total{_labels(result=result)} {count}")
+        lines += [
+            "# HELP ezweb_extract_seconds computing time of the properties",
+            "# TYPE ezweb_extract_seconds summary",
+        ]
+        for e in d["extractions"]:
+            labels = _labels(**{"class": e["class"], "property": e["property"]})
+            lines.append(f"ezweb_extract_seconds_sum{labels} {e['sum']}")
+            lines.append(f"ezweb_extract_seconds_count{labels} {e['count']}")
+        lines += [
+            "# HELP ezweb_extract_parses_total documents parsed while computing the properties",
+            "# TYPE ezweb_extract_parses_total counter",
+        ]
+        for e in d["extractions"]:
+            labels = _labels(**{"class": e["class"], "property": e["property"]})
+            lines.append(f"ezweb_extract_parses_total{labels} {e['parses']}")
+        return "\n".join(lines) + "\n"
+
+
+def enable_metrics(collector: MetricsCollector = None) -> MetricsCollector:
+    """Registers a `MetricsCollector` (a new one if `None`) and returns it"""
+    collector = collector or MetricsCollector()
+    add_hook(collector)
+    return collector
+
+
+def disable_metrics(collector: MetricsCollector):
+    remove_hook(collector)
@@ -0,0 +1,321 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+#
+from ezweb.utils.cache import TTLCache
+
+
+CrawlError = namedtuple("CrawlError", ["url", "error"])
+CrawlError.__doc__ = """The error record of a URL that couldn't be fetched or built , yielded instead of its result"""
+
+
+def _host_of(url: str) -> str:
+    return (urlparse(url).hostname or "").replace("www.", "")
+
+
+def _retry_after(response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _HostState:
+    def __init__(self, concurrency: int) -> None:
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(concurrency)
+        # (loop , future) of the coroutines waiting for a slot , the threads wait on `slots`
+        self.waiters = deque()
+        # the slot holders and waiters , the state isn't dropped while it's used
+        self.users = 0
+        self.next_allowed = 0.0
+        self.crawl_delay = 0.0
+        self.backoff = 1.0
+
+    def idle(self) -> bool:
+        """Nothing would be lost if the state is dropped and made again"""
+        return (
+            self.users == 0
+            and self.backoff == 1.0
+            and self.next_allowed <= time.monotonic()
+        )
+
+    def release(self):
+        self.slots.release()
+        with self.lock:
+            self.wake_next()
+
+    def wake_next(self):
+        """Wakes the first waiting coroutine , `lock` must be held"""
+        while self.waiters:
+            loop, future = self.waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+                return
+            except RuntimeError:
+                # its loop is closed
+                continue
+
+
+class PolitenessScheduler:
+    """
+    Per-host politeness of the fetches
+
+    - at most `per_host_concurrency` in-flight requests to a host
+    - at most `requests_per_second` request starts per host (`None` means no limit)
+    - the `Crawl-delay` of the host robots.txt (see `set_crawl_delay`) is the minimum interval
+    - an adaptive backoff on `429` / `503` responses (honouring `Retry-After`)
+    that decays again with the successful responses
+
+    The state of the idle hosts (no request in flight , no pending delay or backoff)
+    is dropped when more than `max_idle_hosts` hosts are kept ,
+    so a long-running crawler doesn't keep one for every host it has seen.
+    """
+
+    BACKOFF_STATUSES = (429, 503)
+
+    def __init__(
+        self,
+        per_host_concurrency: int = 8,
+        requests_per_second: float = None,
+        max_backoff: float = 64,
+        respect_crawl_delay: bool = True,
+        max_idle_hosts: int = 1024,
+    ) -> None:
+        self.per_host_concurrency = per_host_concurrency
+        self.requests_per_second = requests_per_second
+        self.max_backoff = max_backoff
+        self.respect_crawl_delay = respect_crawl_delay
+        self.max_idle_hosts = max_idle_hosts
+        self._hosts = {}
+        # host -> its `Crawl-delay` , kept when the host state is dropped
+        self._crawl_delays = TTLCache(maxsize=64 * 1024)
+        self._lock = threading.Lock()
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            with self._lock:
+                state = self._new_state(host)
+        return state
+
+    def _new_state(self, host: str) -> _HostState:
+        # `_lock` must be held
+        state = self._hosts.get(host)
+        if state is None:
+            if len(self._hosts) >= self.max_idle_hosts:
+                self._hosts = {h: s for h, s in self._hosts.items() if not s.idle()}
+            state = _HostState(self.per_host_concurrency)
+            state.crawl_delay = self._crawl_delays.get(host, 0.0)
+            self._hosts[host] = state
+        return state
+
+    @contextmanager
+    def _used(self, url: str):
+        """The host state of `url` that isn't dropped until the block ends"""
+        with self._lock:
+            state = self._new_state(_host_of(url))
+            state.users += 1
+        try:
+            yield state
+        finally:
+            with self._lock:
+                state.users -= 1
+
+    def _interval(self, state: _HostState) -> float:
+        interval = 1 / self.requests_per_second if self.requests_per_second else 0.0
+        if self.respect_crawl_delay:
+            interval = max(interval, state.crawl_delay)
+        return interval
+
+    def set_crawl_delay(self, url_or_host: str, seconds: float):
+        host = _host_of(url_or_host) if "://" in url_or_host else url_or_host.replace("www.", "")
+        self._crawl_delays.set(host, float(seconds))
+        self._state(host).crawl_delay = float(seconds)
+
+    def ready_at(self, url: str) -> float:
+        """The (monotonic) time that a new request to the `url` host can start"""
+        return self._state(_host_of(url)).next_allowed
+
+    def _reserve(self, state: _HostState) -> float:
+        """Reserves the next request start of the host , returns the seconds to wait for it"""
+        with state.lock:
+            now = time.monotonic()
+            start = max(now, state.next_allowed)
+            state.next_allowed = start + self._interval(state) * state.backoff
+        return start - now
+
+    @contextmanager
+    def slot(self, url: str):
+        """Blocks until a request to the `url` host is allowed , holds a host slot meanwhile"""
+        with self._used(url) as state:
+            state.slots.acquire()
+            try:
+                wait_for = self._reserve(state)
+                if wait_for > 0:
+                    time.sleep(wait_for)
+                yield
+            finally:
+                state.release()
+
+    @asynccontextmanager
+    async def async_slot(self, url: str):
+        """
+        `slot` of the coroutines , it waits without blocking the event loop :
+        a waiting coroutine is woken when a slot of the host is released
+        """
+        with self._used(url) as state:
+            await self._async_acquire(state)
+            try:
+                wait_for = self._reserve(state)
+                if wait_for > 0:
+                    await asyncio.sleep(wait_for)
+                yield
+            finally:
+                state.release()
+
+    @staticmethod
+    async def _async_acquire(state: _HostState):
+        loop = asyncio.get_running_loop()
+        while True:
+            # registered under the lock so a release between the two isn't missed
+            with state.lock:
+                if state.slots.acquire(blocking=False):
+                    return
+                waiter = (loop, loop.create_future())
+                state.waiters.append(waiter)
+            try:
+                await waiter[1]
+            except asyncio.CancelledError:
+                with state.lock:
+                    if waiter in state.waiters:
+                        state.waiters.remove(waiter)
+                    else:
+                        # it was woken already , the wake-up goes to the next one
+                        state.wake_next()
+                raise
+
+    def feedback(self, url: str, response):
+        """Adapts the host backoff to the `response` status"""
+        state = self._state(_host_of(url))
+        with state.lock:
+            if response.status_code in self.BACKOFF_STATUSES:
+                state.backoff = min(state.backoff * 2, self.max_backoff)
+                wait_for = _retry_after(response)
+                if wait_for is None:
+                    wait_for = max(self._interval(state), 1.0) * state.backoff
+                state.next_allowed = max(state.next_allowed, time.monotonic() + wait_for)
+            elif state.backoff > 1:
+                state.backoff = max(state.backoff / 2, 1.0)
+
+
+def interleaved_map(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    key: Callable[[Any], str] = None,
+    max_workers: int = None,
+    scheduler: Optional[PolitenessScheduler] = None,
+) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+    """
+    Runs `fn(item)` in a thread pool and yields `(item, result, exception)` as they complete.
+
+    The items are dispatched round-robin across their hosts (`key(item)` is the item URL)
+    and never more than the scheduler per-host concurrency for one host ,
+    so the workers aren't all stuck waiting on one slow or throttled host.
+    """
+    key = key or (lambda item: item)
+    max_workers = max_workers or 32
+    per_host = scheduler.per_host_concurrency if scheduler else max_workers
+
+    queues = OrderedDict()
+    for item in items:
+        queues.setdefault(_host_of(key(item)), deque()).append(item)
+
+    running = {}
+    per_host_running = {host: 0 for host in queues}
+
+    def submit_ready(executor):
+        # hosts that can start a request sooner go first
+        hosts = list(queues)
+        if scheduler:
+            hosts.sort(key=lambda h: scheduler.ready_at("https://" + h))
+        for host in hosts:
+            queue = queues[host]
+            while (
+                queue
+                and len(running) < max_workers
+                and per_host_running[host] < per_host
+            ):
+                item = queue.popleft()
+                running[executor.submit(fn, item)] = (host, item)
+                per_host_running[host] += 1
+            if not queue:
+                del queues[host]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        submit_ready(executor)
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                host, item = running.pop(future)
+                per_host_running[host] -= 1
+                error = future.exception()
+                yield item, (None if error else future.result()), error
+            submit_ready(executor)
+
+
+def crawl_map(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    key: Callable[[Any], str] = None,
+    max_workers: int = None,
+) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+    """`interleaved_map` with the politeness scheduler of the process-wide session"""
+    # imported here since the session module imports this one
+    from ezweb.utils.session import get_session
+
+    scheduler = get_session().scheduler or None
+    return interleaved_map(fn, items, key=key, max_workers=max_workers, scheduler=scheduler)
+
+
+def first_result(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: int = None,
+) -> Tuple[Any, Any]:
+    """
+    Runs `fn(item)` concurrently and returns `(item, result)` of the first completed call
+    that its result isn't `None` (`(None, None)` if there isn't) ,
+    the not started calls are cancelled and the running ones aren't waited for
+    """
+    items = list(items)
+    if not items:
+        return None, None
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(items))
+    futures = {executor.submit(fn, item): item for item in items}
+    try:
+        for future in as_completed(futures):
+            if future.exception() is None and future.result() is not None:
+                return futures[future], future.result()
+        return None, None
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
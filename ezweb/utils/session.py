@@ -0,0 +1,514 @@
+import socket
+import threading
+import time
+from typing import Dict, Iterable, Union
+import requests
+from requests.adapters import HTTPAdapter, DEFAULT_POOLBLOCK
+from urllib3 import PoolManager
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.connection import allowed_gai_family
+from urllib3.util.retry import Retry
+
+#
+from ezweb.utils import metrics
+from ezweb.utils.httpcache import ResponseCache
+from ezweb.utils.scheduler import PolitenessScheduler
+
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36"
+}
+
+
+class ResponseTooLarge(requests.RequestException):
+    """The body is longer than the `max_bytes` of the fetch"""
+
+
+class UnexpectedContentType(requests.RequestException):
+    """The `Content-Type` of the response isn't one of the `content_types` of the fetch"""
+
+
+def content_type_of(headers) -> str:
+    return headers.get("Content-Type", "").split(";")[0].strip().lower()
+
+
+def check_content_type(response, content_types: Iterable[str] = None):
+    """
+    Raises `UnexpectedContentType` if the response `Content-Type` doesn't start with
+    one of the `content_types` , a response without `Content-Type` is accepted
+    """
+    if not content_types or not response.ok:
+        return
+    content_type = content_type_of(response.headers)
+    if content_type and not content_type.startswith(tuple(content_types)):
+        raise UnexpectedContentType(
+            f"{content_type} is not one of {list(content_types)} : {response.url}",
+            response=response,
+        )
+
+
+def check_content_length(response, max_bytes: int = None, truncate: bool = False):
+    """Raises `ResponseTooLarge` if the `Content-Length` header is already more than `max_bytes`"""
+    length = response.headers.get("Content-Length", "")
+    if max_bytes is None or truncate or not length.isdigit():
+        return
+    if int(length) > max_bytes:
+        raise ResponseTooLarge(
+            f"{length} bytes is more than {max_bytes} bytes : {response.url}",
+            response=response,
+        )
+
+
+def read_limited(
+    response: requests.Response,
+    max_bytes: int = None,
+    content_types: Iterable[str] = None,
+    truncate: bool = False,
+    chunk_size: int = 64 * 1024,
+    stop_at: bytes = None,
+) -> requests.Response:
+    """
+    Reads the body of a `stream=True` response , the `Content-Type` and `Content-Length`
+    headers are checked before reading anything and the read stops at `max_bytes`
+    (of the decoded body) , then it raises `ResponseTooLarge` or keeps the first `max_bytes`
+    if `truncate` (`response.truncated` is set then).
+
+    `stop_at` (e.g. `b"</head>"` , matched case-insensitively) stops the read too ,
+    the body is kept up to the end of it and `response.truncated` is set.
+
+    The connection is dropped when the body isn't read to the end.
+    """
+    body = bytearray()
+    response.truncated = False
+    marker = stop_at.lower() if stop_at else None
+    try:
+        check_content_type(response, content_types)
+        check_content_length(response, max_bytes, truncate)
+        for chunk in response.iter_content(chunk_size):
+            # the marker can be split between two chunks
+            start = max(len(body) - len(marker) + 1, 0) if marker else 0
+            body += chunk
+            found = body[start:].lower().find(marker) if marker else -1
+            if found != -1 and (max_bytes is None or start + found < max_bytes):
+                del body[start + found + len(marker):]
+                response.truncated = True
+                break
+            if max_bytes is not None and len(body) > max_bytes:
+                if not truncate:
+                    raise ResponseTooLarge(
+                        f"the body is more than {max_bytes} bytes : {response.url}",
+                        response=response,
+                    )
+                del body[max_bytes:]
+                response.truncated = True
+                break
+    finally:
+        response.close()
+    response._content = bytes(body)
+    return response
+
+
+def check_limits(
+    response: requests.Response,
+    max_bytes: int = None,
+    content_types: Iterable[str] = None,
+    truncate: bool = False,
+    stop_at: bytes = None,
+) -> requests.Response:
+    """
+    The `read_limited` limits of a response that its body is already read
+    (e.g. served from the `ResponseCache`) , it's truncated in place or an error is raised
+    """
+    check_content_type(response, content_types)
+    content = response.content
+    response.truncated = False
+    if stop_at:
+        found = content.lower().find(stop_at.lower())
+        if found != -1 and (max_bytes is None or found < max_bytes):
+            response._content = content[: found + len(stop_at)]
+            response.truncated = True
+            return response
+    if max_bytes is not None and len(content) > max_bytes:
+        if not truncate:
+            raise ResponseTooLarge(
+                f"the body is more than {max_bytes} bytes : {response.url}",
+                response=response,
+            )
+        response._content = content[:max_bytes]
+        response.truncated = True
+    return response
+
+
+class SessionStats:
+    """
+    Thread-safe counters of the requests sent and the TCP connections opened
+    by an `EzSession` , `requests - connections` is the count of
+    requests that reused an already open (keep-alive) connection
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+
+    def request_sent(self):
+        with self._lock:
+            self.requests += 1
+
+    def connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    @property
+    def reused(self):
+        return max(self.requests - self.connections, 0)
+
+    @property
+    def reuse_ratio(self):
+        if not self.requests:
+            return 0.0
+        return round(self.reused / self.requests, 3)
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "connections": self.connections,
+            "reused": self.reused,
+            "reuse_ratio": self.reuse_ratio,
+        }
+
+
+class _CountingPoolMixin:
+    stats: SessionStats = None
+
+    def _new_conn(self):
+        # the connection counts its sockets , a pooled one can reconnect
+        conn = super()._new_conn()
+        conn.stats = self.stats
+        return conn
+
+    def _make_request(self, *args, **kwargs):
+        if self.stats:
+            self.stats.request_sent()
+        return super()._make_request(*args, **kwargs)
+
+
+class _TimedConnectionMixin:
+    # counts the TCP connects in the `SessionStats` and reports the DNS and connect
+    # (TCP + TLS) times of the new connections to the metrics
+    stats: SessionStats = None
+
+    def _new_conn(self):
+        if not metrics.hooks:
+            return super()._new_conn()
+        start = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(
+                self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM
+            )
+        except socket.gaierror:
+            # urllib3 raises its own error of it
+            return super()._new_conn()
+        metrics.note_connection(dns=time.perf_counter() - start)
+        # connect to the resolved address so it isn't resolved again
+        # (TLS still verifies `self.host`)
+        dns_host = self._dns_host
+        self._dns_host = infos[0][4][0]
+        try:
+            return super()._new_conn()
+        except Exception:
+            if len(infos) == 1:
+                raise
+        finally:
+            self._dns_host = dns_host
+        # the other addresses of the host (e.g. IPv4 after IPv6) like a normal connection
+        return super()._new_conn()
+
+    def connect(self):
+        if self.stats:
+            self.stats.connection_opened()
+        if not metrics.hooks:
+            return super().connect()
+        dns_before, _ = metrics.connection_times()
+        start = time.perf_counter()
+        super().connect()
+        dns, _ = metrics.connection_times()
+        metrics.note_connection(connect=time.perf_counter() - start - (dns - dns_before))
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _CountingPoolManager(PoolManager):
+    def __init__(self, *args, stats: SessionStats = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = stats
+        self.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context)
+        pool.stats = self.stats
+        return pool
+
+
+class _CountingAdapter(HTTPAdapter):
+    def __init__(self, stats: SessionStats, **kwargs) -> None:
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(
+        self, connections, maxsize, block=DEFAULT_POOLBLOCK, **pool_kwargs
+    ):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = _CountingPoolManager(
+            num_pools=connections,
+            maxsize=maxsize,
+            block=block,
+            stats=self.stats,
+            **pool_kwargs,
+        )
+
+
+class EzSession:
+    """
+    A pooled HTTP session that all the ezweb fetches go through.
+
+    The connection pools (adapters) are shared between threads ,
+    but each thread gets its own `requests.Session` on top of them
+    since `requests.Session` itself is not thread-safe.
+
+    ## Parameters :
+    `pool_connections` :
+    how many hosts connection pools are kept alive
+
+    `pool_maxsize` :
+    max kept-alive connections per host
+
+    `host_pool_sizes` :
+    custom `pool_maxsize` for some hosts e.g. `{"www.example.com": 64}`
+
+    `retries` , `backoff_factor` , `status_forcelist` :
+    the `urllib3` retry policy of the GET and HEAD requests
+
+    `timeout` :
+    default timeout (seconds) of each request
+
+    `cache` :
+    an optional `ResponseCache` that the GET requests are served from and revalidated with
+
+    `scheduler` :
+    the per-host `PolitenessScheduler` of the requests , a default one if `None`
+    and no politeness at all if `False`
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 32,
+        pool_maxsize: int = 16,
+        host_pool_sizes: Dict[str, int] = None,
+        retries: int = 2,
+        backoff_factor: float = 0.3,
+        status_forcelist: Iterable[int] = (500, 502, 504),
+        timeout: float = 30,
+        headers: dict = None,
+        cache: ResponseCache = None,
+        scheduler: Union[PolitenessScheduler, bool] = None,
+    ) -> None:
+        self.timeout = timeout
+        self.cache = cache
+        if scheduler is None:
+            scheduler = PolitenessScheduler()
+        self.scheduler = scheduler or None
+        self.headers = {**DEFAULT_HEADERS, **(headers or {})}
+        self.stats = SessionStats()
+        self._local = threading.local()
+
+        self.retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=tuple(status_forcelist),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            raise_on_status=False,
+        )
+        self._adapters = {}
+        default = self._new_adapter(pool_connections, pool_maxsize)
+        self._adapters["http://"] = default
+        self._adapters["https://"] = default
+        for host, size in (host_pool_sizes or {}).items():
+            adapter = self._new_adapter(1, size)
+            self._adapters[f"http://{host}/"] = adapter
+            self._adapters[f"https://{host}/"] = adapter
+
+    def _new_adapter(self, pool_connections: int, pool_maxsize: int):
+        return _CountingAdapter(
+            self.stats,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=self.retry,
+        )
+
+    @property
+    def session(self) -> requests.Session:
+        """The `requests.Session` of the current thread"""
+        s = getattr(self._local, "session", None)
+        if s is None:
+            s = requests.Session()
+            s.headers.update(self.headers)
+            for prefix, adapter in self._adapters.items():
+                s.mount(prefix, adapter)
+            self._local.session = s
+        return s
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        if self.scheduler is None:
+            return self.session.request(method, url, **kwargs)
+        with self.scheduler.slot(url):
+            response = self.session.request(method, url, **kwargs)
+        self.scheduler.feedback(url, response)
+        return response
+
+    def get(
+        self,
+        url: str,
+        max_bytes: int = None,
+        content_types: Iterable[str] = None,
+        truncate: bool = False,
+        stop_at: bytes = None,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        `max_bytes` , `content_types` , `truncate` and `stop_at` limit the body that is read ,
+        see `read_limited`
+        """
+        kwargs.setdefault("allow_redirects", True)
+        limits = None
+        if max_bytes is not None or content_types or stop_at:
+            if kwargs.get("stream"):
+                raise ValueError("A limited fetch reads the body itself , it can't be streamed")
+            limits = dict(
+                max_bytes=max_bytes,
+                content_types=content_types,
+                truncate=truncate,
+                stop_at=stop_at,
+            )
+        if self.cache is None or kwargs.get("stream"):
+            fetch = self._get
+        else:
+            fetch = self._cached_get
+        if not metrics.hooks:
+            return fetch(url, limits, **kwargs)
+        return self._measured("GET", url, fetch, url, limits, **kwargs)
+
+    @staticmethod
+    def _measured(method: str, url: str, fetch, *args, **kwargs) -> requests.Response:
+        # reports the request to the metrics hooks
+        start = metrics.fetch_started()
+        try:
+            response = fetch(*args, **kwargs)
+        except Exception as e:
+            metrics.fetch_finished(method, url, start, error=e)
+            raise
+        metrics.fetch_finished(method, url, start, response)
+        return response
+
+    def _get(self, url: str, limits: dict = None, **kwargs) -> requests.Response:
+        if limits is None:
+            return self.request("GET", url, **kwargs)
+        response = self.request("GET", url, stream=True, **kwargs)
+        return read_limited(response, **limits)
+
+    def _cached_get(self, url: str, limits: dict = None, **kwargs) -> requests.Response:
+        entry = self.cache.get(url)
+        if entry and entry.is_fresh:
+            return self._limited(entry.to_response(), limits)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry:
+            headers = {**entry.validators, **headers}
+        response = self._get(url, limits, headers=headers, **kwargs)
+
+        if entry and response.status_code == 304:
+            entry = self.cache.revalidated(entry, response.headers)
+            return self._limited(entry.to_response(not_modified=True), limits)
+
+        if not getattr(response, "truncated", False):
+            self.cache.store(url, response)
+        response.from_cache = False
+        response.not_modified = False
+        return response
+
+    @staticmethod
+    def _limited(response: requests.Response, limits: dict = None) -> requests.Response:
+        # a cached entry can be stored by a fetch without (or with other) limits
+        if limits is None:
+            return response
+        return check_limits(response, **limits)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("allow_redirects", False)
+        if not metrics.hooks:
+            return self.request("HEAD", url, **kwargs)
+        return self._measured("HEAD", url, self.request, "HEAD", url, **kwargs)
+
+    def close(self):
+        for adapter in set(self._adapters.values()):
+            adapter.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+_session: EzSession = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> EzSession:
+    """Returns the process-wide `EzSession` , creates it on the first call"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = EzSession()
+    return _session
+
+
+def set_session(session: EzSession):
+    global _session
+    with _session_lock:
+        old = _session
+        _session = session
+    if old is not None and old is not session:
+        old.close()
+
+
+def configure_session(**kwargs) -> EzSession:
+    """
+    Replaces the process-wide session with a new `EzSession(**kwargs)`
+
+    ## Example :
+    ```python
+    configure_session(pool_maxsize=64, host_pool_sizes={"www.theverge.com": 128}, retries=3)
+    ```
+    """
+    session = EzSession(**kwargs)
+    set_session(session)
+    return session
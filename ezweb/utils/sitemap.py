@@ -0,0 +1,178 @@
+import gzip
+import io
+from collections import deque, namedtuple
+from typing import Iterator, List, Union
+from lxml import etree
+from requests import RequestException
+
+#
+from ezweb.utils.http import safe_get, url_path_contains
+from ezweb.utils.store import KeyValueStore
+
+
+SitemapEntry = namedtuple("SitemapEntry", ["loc", "lastmod", "is_sitemap"])
+SitemapEntry.__doc__ = """
+A `<url>` (page) or `<sitemap>` (child sitemap of a sitemap index) entry of a sitemap
+"""
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _local_name(tag) -> str:
+    if not isinstance(tag, str):
+        # comments and processing instructions
+        return ""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child_text(element, name: str):
+    for child in element:
+        if _local_name(child.tag) == name:
+            text = (child.text or "").strip()
+            return text or None
+    return None
+
+
+def _body_stream(response) -> io.BufferedReader:
+    """Returns the decoded body stream of a streamed response , gunzipped if it's a `.gz` file"""
+    raw = response.raw
+    # `Content-Encoding: gzip` is decoded by urllib3 itself
+    raw.decode_content = True
+    # let the buffered reader see the end of the body instead of a closed file
+    raw.auto_close = False
+    stream = io.BufferedReader(raw, buffer_size=64 * 1024)
+    if stream.peek(2)[:2] == _GZIP_MAGIC:
+        # a `.xml.gz` file served as-is
+        return io.BufferedReader(gzip.GzipFile(fileobj=stream))
+    return stream
+
+
+def iter_site_map(sitemap_url: str, contain: List[str] = None) -> Iterator[SitemapEntry]:
+    """
+    Parses the sitemap (or sitemap index) incrementally while it's downloading
+    and yields its entries , so the memory usage doesn't depend on the sitemap size.
+    `.xml.gz` sitemaps are supported.
+
+    ## Parameters :
+    `contain` :
+    yield just the pages that their first or second path part contains one of these words
+    (the child sitemaps of an index are always yielded)
+
+    ## Example :
+    ```python
+    for entry in iter_site_map("https://www.example.com/sitemap.xml"):
+        print(entry.loc, entry.lastmod)
+    ```
+    """
+    response = safe_get(sitemap_url, stream=True, log_name="streaming sitemap")
+    try:
+        events = etree.iterparse(
+            _body_stream(response),
+            events=("end",),
+            recover=True,
+            huge_tree=True,
+            resolve_entities=False,
+            no_network=True,
+        )
+        for _, element in events:
+            name = _local_name(element.tag)
+            if name not in ("url", "sitemap"):
+                continue
+            loc = _child_text(element, "loc")
+            lastmod = _child_text(element, "lastmod")
+            is_sitemap = name == "sitemap"
+
+            # free the parsed entries , the tree never holds more than one of them
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+            if not loc:
+                continue
+            if contain and not is_sitemap and not url_path_contains(loc, contain):
+                continue
+            yield SitemapEntry(loc, lastmod, is_sitemap)
+    finally:
+        response.close()
+
+
+class SitemapState:
+    """
+    Remembers the last seen `lastmod` of the pages and the child sitemaps
+    in a persistent store to crawl a sitemap incrementally
+    """
+
+    def __init__(self, store: Union[str, KeyValueStore]) -> None:
+        if isinstance(store, str):
+            store = KeyValueStore(store, table="sitemap_lastmod")
+        self.store = store
+
+    def _key(self, entry: SitemapEntry) -> str:
+        prefix = "sitemap" if entry.is_sitemap else "url"
+        return f"{prefix}:{entry.loc}"
+
+    def is_changed(self, entry: SitemapEntry) -> bool:
+        """
+        Whether the entry is new or its `lastmod` has moved ,
+        an already seen entry without `lastmod` is treated as unchanged for pages
+        and as changed for child sitemaps (they can't be skipped safely)
+        """
+        key = self._key(entry)
+        if key not in self.store:
+            return True
+        if entry.lastmod is None:
+            return entry.is_sitemap
+        return self.store.get(key) != entry.lastmod
+
+    def mark(self, entry: SitemapEntry):
+        self.store.set(self._key(entry), entry.lastmod)
+
+    def flush(self):
+        self.store.flush()
+
+
+def walk_site_map(
+    sitemap_url: str, contain: List[str] = None, state: SitemapState = None
+) -> Iterator[SitemapEntry]:
+    """
+    Streams the page entries of a sitemap and (recursively) its child sitemaps ,
+    one sitemap is downloaded and parsed at a time.
+
+    With a `state` just the new or changed pages are yielded (and marked as seen after the
+    consumer takes the next one) ,
+    and the child sitemaps that their `lastmod` hasn't moved are not downloaded at all.
+    A child sitemap is marked after all of its entries are yielded ,
+    so an interrupted crawl checks it again the next time.
+    """
+    root = SitemapEntry(sitemap_url, None, True)
+    pending = deque([root])
+    seen = {sitemap_url}
+    while pending:
+        sitemap = pending.popleft()
+        try:
+            for entry in iter_site_map(sitemap.loc, contain=contain):
+                if entry.is_sitemap:
+                    if entry.loc in seen:
+                        continue
+                    seen.add(entry.loc)
+                    if state is None or state.is_changed(entry):
+                        pending.append(entry)
+                    continue
+                if state is not None and not state.is_changed(entry):
+                    continue
+                yield entry
+                # marked when the consumer is done with it , a stopped walk yields it again
+                if state is not None:
+                    state.mark(entry)
+        except (RequestException, etree.XMLSyntaxError):
+            if sitemap is root:
+                raise
+            # a broken child sitemap shouldn't stop the others
+            continue
+        if state is not None and sitemap is not root:
+            state.mark(sitemap)
+            state.flush()
+    if state is not None:
+        state.flush()
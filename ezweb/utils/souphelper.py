@@ -5,19 +5,140 @@ from typing import List, Union
 from bs4 import BeautifulSoup
 from bs4.element import Tag
 from unidecode import unidecode
-from cached_property import cached_property
 import itertools
+import logging
+from collections import defaultdict
 
 #
+# reports the computing time of the properties to the metrics hooks
+from ezweb.utils.metrics import timed_cached_property as cached_property
 from ezweb.utils.http import name_from_url, pure_url
 from ezweb.utils.text import clean_text, clean_title, similarity_of
 
+logger = logging.getLogger(__name__)
+
+
+# attribute values HTML compares case-insensitively ( `type="application/RSS+xml"` ... )
+# they are lower-cased in the index and in the queries , like the CSS selectors do
+CASE_INSENSITIVE_ATTRS = frozenset(
+    {
+        "type", "rel", "rev", "lang", "hreflang", "charset", "accept-charset",
+        "http-equiv", "media", "method", "enctype", "dir", "align", "valign",
+        "target", "shape", "scope", "codetype", "language",
+    }
+)
+
+
+def _normalized(attr: str, value: str) -> str:
+    return value.lower() if attr in CASE_INSENSITIVE_ATTRS else value
+
+
+class SoupIndex:
+    """
+    One-pass index of the soup elements (built on the first query)
+    so the repeated `all` , `first` and `contains` queries don't walk the whole tree again.
+
+    - tag name -> elements
+    - attribute name -> (attribute value , element) , for the substring (`*=`) lookups
+    """
+
+    def __init__(self, soup: BeautifulSoup) -> None:
+        self.by_name = defaultdict(list)
+        self.by_attr = defaultdict(list)
+        self.position = {}
+        for i, tag in enumerate(soup.find_all(True)):
+            self.position[id(tag)] = i
+            self.by_name[tag.name].append(tag)
+            for attr, value in tag.attrs.items():
+                if isinstance(value, list):
+                    # multi-valued attributes like `class` : matched as a CSS selector does
+                    value = " ".join(value)
+                self.by_attr[attr].append((_normalized(attr, value), tag))
+        self._contains = {}
+
+    def _in_order(self, tags: List[Tag]) -> List[Tag]:
+        return sorted(tags, key=lambda t: self.position[id(t)])
+
+    def named(self, tag_name) -> List[Tag]:
+        if tag_name is True:
+            return self._in_order([t for tags in self.by_name.values() for t in tags])
+        if isinstance(tag_name, str):
+            return self.by_name.get(tag_name, [])
+        tags = [t for name in set(tag_name) for t in self.by_name.get(name, [])]
+        return self._in_order(tags)
+
+    def contains(self, tag_name: str, attr: str, value: str) -> List[Tag]:
+        """Same as the CSS selector `tag_name[attr*="value"]`"""
+        key = (tag_name, attr, value)
+        result = self._contains.get(key)
+        if result is None:
+            any_tag = tag_name == "*"
+            value = _normalized(attr, value)
+            result = [
+                tag
+                for attr_value, tag in self.by_attr.get(attr, [])
+                if value and value in attr_value and (any_tag or tag.name == tag_name)
+            ]
+            self._contains[key] = result
+        return list(result)
+
+    @staticmethod
+    def supports(tag_name, attrs: dict) -> bool:
+        """Whether a `find_all(tag_name, attrs)` query can be answered from the index"""
+        if not (tag_name is True or isinstance(tag_name, (str, list, tuple, set))):
+            return False
+        return all(v is True or isinstance(v, str) for v in attrs.values())
+
+    def find_all(self, tag_name, attrs: dict) -> List[Tag]:
+        tags = self.named(tag_name)
+        if not attrs:
+            return list(tags)
+        return [t for t in tags if all(_attr_matches(t, k, v) for k, v in attrs.items())]
+
+
+def _attr_matches(tag: Tag, attr: str, expected) -> bool:
+    value = tag.get(attr)
+    if value is None:
+        return False
+    if expected is True:
+        return True
+    if attr in CASE_INSENSITIVE_ATTRS:
+        expected = expected.lower()
+        value = [v.lower() for v in value] if isinstance(value, list) else value.lower()
+    if isinstance(value, list):
+        return expected in value or " ".join(value) == expected
+    return value == expected
+
+
+def _query_attrs(args: tuple, kwargs: dict):
+    """
+    Returns the attribute filters of a `find` / `find_all` call
+    or `None` if the call has other arguments (string , limit , regex ...)
+    """
+    kwargs = dict(kwargs)
+    attrs = dict(kwargs.pop("attrs", None) or {})
+    if args:
+        if len(args) > 1 or not isinstance(args[0], dict):
+            return None
+        attrs.update(args[0])
+    if "class_" in kwargs:
+        kwargs["class"] = kwargs.pop("class_")
+    for special in ("recursive", "string", "text", "limit"):
+        if special in kwargs:
+            return None
+    attrs.update(kwargs)
+    return attrs
+
 
 class EzSoupHelper:
     def __init__(self, soup: BeautifulSoup, url: str) -> None:
         self.soup = soup
         self.url = url
 
+    @cached_property
+    def index(self) -> SoupIndex:
+        return SoupIndex(self.soup)
+
     @cached_property
     def site_name(self):
         og_site_name = self.meta_og_content("site_name")
@@ -104,7 +225,7 @@ class EzSoupHelper:
         article_ul_tag = article.find("ul") if article else None
         article_ul_a = article_ul_tag.find_all("a") if article_ul_tag else []
 
-        print("maybe", len(maybe_elements), "article_ul", len(article_ul_a))
+        logger.debug("maybe %s article_ul %s", len(maybe_elements), len(article_ul_a))
         tags = maybe_elements + article_ul_a
         return tags
 
@@ -232,10 +353,17 @@ class EzSoupHelper:
         result = json.loads(string) if string and string != "" else None
         return result
 
-    def all(self, tag_name: str, **kwargs) -> Union[List[Tag], None]:
-        return self.soup.find_all(tag_name, **kwargs)
+    def all(self, tag_name: str, *args, **kwargs) -> Union[List[Tag], None]:
+        attrs = _query_attrs(args, kwargs)
+        if attrs is not None and SoupIndex.supports(tag_name, attrs):
+            return self.index.find_all(tag_name, attrs)
+        return self.soup.find_all(tag_name, *args, **kwargs)
 
     def first(self, tag_name: str, *args, **kwargs):
+        attrs = _query_attrs(args, kwargs)
+        if attrs is not None and SoupIndex.supports(tag_name, attrs):
+            found = self.index.find_all(tag_name, attrs)
+            return found[0] if found else None
         return self.soup.find(tag_name, *args, **kwargs)
 
     def xpath(self, pattern: str):
@@ -277,7 +405,7 @@ class EzSoupHelper:
         you can use any HTML tag with it's own attributes
 
         """
-        return self.xpath(f'{tag_name}[{attr}*="{value}"]')
+        return self.index.contains(tag_name, attr, value)
 
     def linked_files(self, extension: str):
         """
@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import threading
+from typing import Iterable, Iterator, Optional, Tuple
+
+
+class KeyValueStore:
+    """
+    A small persistent (SQLite) string key-value store ,
+    the writes are buffered and committed every `batch_size` writes or by `flush()`
+
+    ## Example :
+    ```python
+    store = KeyValueStore("~/.ezweb/state.sqlite", table="sitemap")
+    store.set("https://example.com/a", "2022-01-01")
+    store.get("https://example.com/a")
+    ```
+    """
+
+    def __init__(self, path: str, table: str = "items", batch_size: int = 1000) -> None:
+        path = os.path.expanduser(path)
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        if not table.isidentifier():
+            raise ValueError(f"{table} is not a valid table name")
+        self.path = path
+        self.table = table
+        self.batch_size = batch_size
+        self._pending = {}
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT)"
+            )
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            row = self._db.execute(
+                f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else default
+
+    def set(self, key: str, value: Optional[str]):
+        with self._lock:
+            self._pending[key] = value
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def set_many(self, items: Iterable[Tuple[str, Optional[str]]]):
+        with self._lock:
+            for key, value in items:
+                self.set(key, value)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._pending.pop(key, None)
+            with self._db:
+                self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def items(self) -> Iterator[Tuple[str, Optional[str]]]:
+        self.flush()
+        with self._lock:
+            rows = self._db.execute(f"SELECT key, value FROM {self.table}").fetchall()
+        return iter(rows)
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            with self._db:
+                self._db.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?)",
+                    self._pending.items(),
+                )
+            self._pending.clear()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._db.close()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._pending:
+                return True
+            row = self._db.execute(
+                f"SELECT 1 FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()